@@ -5,6 +5,8 @@ https://transmission.bpa.gov/Business/Operations/Wind/default.aspx
 """
 
 import datetime 
+import os
+import sys
 
 import matplotlib.pyplot as plt
 import matplotlib.dates as mdates
@@ -12,19 +14,12 @@ import matplotlib.ticker as mtick
 import numpy as np
 import pandas as pd
 
-def load(fname, skiprows):
-    print('Loading {}...'.format(fname))
-    data1 = pd.read_excel(fname, "January-June", header=0, skiprows=range(skiprows))
-    data2 = pd.read_excel(fname, "July-December", header=0, skiprows=range(skiprows))
-    data = pd.concat([data1, data2])
-    data = data.rename(columns={'TOTAL WIND GENERATION  IN BPA CONTROL AREA (MW; SCADA 79687)':'Wind', 
-                                'TOTAL HYDRO GENERATION (MW; SCADA 79682)':'Hydro',
-                                'TOTAL FOSSIL/BIOMASS GENERATION (MW; SCADA 16377)':'Fossil/Biomass',
-                                'TOTAL NUCLEAR GENERATION (MW; 70681)':'Nuclear',
-                                })
-    data = data.set_index(pd.to_datetime(data['Date/Time']))
-    data = data.dropna(thresh=len(data.columns)-4) # drop rows with all N/As
-    return data
+# shared loaders live with the rest of the grid tools
+PLOTS = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'plots')
+sys.path.insert(0, os.path.join(PLOTS, 'intermittency'))
+sys.path.insert(0, PLOTS)
+from bpa import load, load_clean
+import bigraster
 
 def plot_december(data):
     """Plot generation in BPA in the first half of December."""
@@ -61,13 +56,16 @@ def plot_capacity(data, start = '2017-01-01', end = '2017-12-25', year = "2017")
     df = df[['Wind']]#,'Hydro','Nuclear','Fossil/Biomass']]
     x = np.array([di.to_pydatetime() for di in df.index])
     y = df.values.flatten()
+    # NaN where the data has a gap too long to interpolate (see load_clean)
+    valid = ~np.isnan(y)
     #capacity = 4000 # kind of a guess, goes higher sometimes but also is dynamic 
-    capacity = max(y)
-    cap_factor = sum(y) / (capacity*len(y))
+    capacity = np.nanmax(y)
+    # average over the time we have data for, not counting gaps as calm
+    cap_factor = np.nanmean(y) / capacity
     #df.plot.area(figsize=(12,8), ax=ax)
     ax.axhline(y=capacity,linestyle='--',color='red')
-    ax.fill_between(x, y, capacity,label='Calm', color='lightblue', alpha=1.0, linewidth=0.2)
-    ax.fill_between(x, 0, y, label='Windy', color='green', linewidth=0.2)
+    ax.fill_between(x, y, capacity, where=valid, label='Calm', color='lightblue', alpha=1.0, linewidth=0.2)
+    ax.fill_between(x, 0, y, where=valid, label='Windy', color='green', linewidth=0.2)
     plt.text(x[2000], capacity+20, 'Max capacity if all turbines were spinning',color='red')
     plt.text(x[1000], 4200, 'Approx. capacity factor: {:.0f}%'.format(cap_factor* 100))
     plt.title(f'Electricity Generation by Wind in the Bonnevile Power Administration Control Area ({year})')
@@ -85,13 +83,14 @@ def plot_capacity(data, start = '2017-01-01', end = '2017-12-25', year = "2017")
     ax.set_xbound(lower=min(x), upper=max(x))
     fig.tight_layout()
     #plt.savefig('monthly_generation.png')
-    fig.savefig(f'wind_generation_{year}.png')
+    # 7200x4800: draw it in strips so it fits on small machines
+    bigraster.savefig(fig, f'wind_generation_{year}.png')
 
 if __name__=='__main__':
     #data = load('WindGenTotalLoadYTD_2017.xls',21)
     #data = load('WindGenTotalLoadYTD_2019.xls',23)
     #data = load('WindGenTotalLoadYTD_2018.xls',23)
-    data = load('WindGenTotalLoadYTD_2020.xls',23)
+    data, _cleaned = load_clean('WindGenTotalLoadYTD_2020.xls',23)
     #data = load('WindGenTotalLoadYTD_2017.xls')
     plot_capacity(data, start = '2020-01-01', end = '2020-10-17', year = "2020")
     #plot_december(data)
@@ -7,15 +7,15 @@ import matplotlib.pyplot as plt
 
 def load(fname=os.path.join('..','data','energy-sources.yaml')):
     with open(fname) as f:
-        alldata = yaml.load(f)
+        alldata = yaml.safe_load(f)
         data = alldata['co2 emissions']
     return data
 
 def plot(data, fname='world-co2-emissions.png'):
     fig, ax = plt.subplots(figsize=(9,7))
     vals = data['val']
-    x = range(2008,2019)
     for location, co2 in vals.items():
+        x = range(data['start'], data['start'] + len(co2))
         co2 = [di/1e3 for di in co2] # convert to billion
         plt.plot(x, co2, '-o', label=location)
     plt.text(0.6,-0.1, 'Data from: {}'.format(data['ref']), transform=ax.transAxes,fontsize='x-small')
@@ -0,0 +1,311 @@
+"""
+Fetch the datasets the plots need, into a local content-addressed cache.
+
+    python datasets.py                  # everything that's missing or stale
+    python datasets.py bpa-wind-2020    # just some
+    python datasets.py --list
+    python datasets.py --mirror http://otherbox:8000/
+
+The registry is data/datasets.yaml plus every ``url`` cited in
+energy-sources.yaml. Downloads run concurrently. Each one is stored once
+under its sha256 in ~/.cache/outreach-material/datasets/objects, read-only,
+and then copied to where the scripts expect it. (Not linked: editing the
+working copy would change the stored object too.) The ETag and
+Last-Modified of every download are kept in the cache index, so the next
+run sends If-None-Match / If-Modified-Since and a 304 costs nothing. If a
+server can't be reached, whatever is already cached is used. A file that's
+already in place but didn't come from the cache (like the hand-edited EIA
+workbook) is never overwritten.
+
+``--mirror`` fetches every file as <mirror>/<dest> instead of from its
+original source. Any checkout that already has the files can be the mirror:
+
+    python -m http.server 8000          # from the root of that checkout
+
+which is also how the hand-exported files (no url) get onto a new machine.
+"""
+import argparse
+import concurrent.futures
+import hashlib
+import json
+import os
+import re
+import shutil
+import typing
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+REGISTRY = os.path.join(ROOT, "data", "datasets.yaml")
+SOURCES = os.path.join(ROOT, "data", "energy-sources.yaml")
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "outreach-material",
+    "datasets",
+)
+USER_AGENT = "outreach-material-datasets/1"
+BLOCK = 1 << 16
+
+
+class Dataset(typing.NamedTuple):
+    name: str
+    url: typing.Optional[str]  # None for files exported by hand
+    dest: str  # relative to the repository root
+    sha256: typing.Optional[str] = None  # pinned contents, if known
+    ref: str = ""
+    note: str = ""
+
+
+def _slug(text):
+    return re.sub(r"[^a-z0-9]+", "-", text.lower()).strip("-")
+
+
+def _reference_dest(name, url):
+    """Where a cited reference goes: data/references/<name>.<ext>."""
+    ext = os.path.splitext(urllib.parse.urlsplit(url).path)[1]
+    if ext in ("", ".php", ".aspx", ".html", ".htm"):
+        ext = ".html"
+    return f"data/references/{name}{ext}"
+
+
+def registry(fname=REGISTRY, sources=SOURCES):
+    """Return {name: Dataset} from datasets.yaml and the energy-sources refs."""
+    with open(fname) as f:
+        entries = yaml.safe_load(f) or {}
+    datasets = {
+        name: Dataset(name, e.get("url"), e["dest"], e.get("sha256"), e.get("ref", ""), e.get("note", ""))
+        for name, e in entries.items()
+    }
+    if sources and os.path.exists(sources):
+        with open(sources) as f:
+            for key, section in (yaml.safe_load(f) or {}).items():
+                if not isinstance(section, dict) or not section.get("url"):
+                    continue
+                name = _slug(key)
+                datasets.setdefault(
+                    name,
+                    Dataset(name, section["url"], _reference_dest(name, section["url"]), ref=section.get("ref", "")),
+                )
+    return datasets
+
+
+class Cache:
+    """
+    Content-addressed store plus an index of what each URL last returned.
+
+    Objects are immutable files named by their sha256; the index maps a URL
+    to {"sha256", "etag", "last-modified"}.
+    """
+
+    def __init__(self, path=CACHE_DIR):
+        self.path = path
+        self.index_file = os.path.join(path, "index.json")
+        os.makedirs(os.path.join(path, "objects"), exist_ok=True)
+        try:
+            with open(self.index_file) as f:
+                self.index = json.load(f)
+        except (OSError, ValueError):
+            self.index = {}
+
+    def object(self, digest):
+        return os.path.join(self.path, "objects", digest[:2], digest)
+
+    def has(self, digest):
+        return bool(digest) and os.path.exists(self.object(digest))
+
+    def add(self, tmp, digest):
+        """Move a finished download into the store."""
+        obj = self.object(digest)
+        os.makedirs(os.path.dirname(obj), exist_ok=True)
+        os.replace(tmp, obj)
+        os.chmod(obj, 0o444)
+        return obj
+
+    def save(self):
+        tmp = f"{self.index_file}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.index, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.index_file)
+
+
+def sha256sum(fname):
+    h = hashlib.sha256()
+    with open(fname, "rb") as f:
+        for block in iter(lambda: f.read(BLOCK), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _install(obj, digest, dest):
+    """
+    Copy a cached object to dest, checking it still hashes to its name.
+
+    Caches from before objects were read-only may have been edited through
+    a hard link; a bad object is dropped (ValueError) so the next fetch
+    downloads it again.
+    """
+    os.makedirs(os.path.dirname(dest), exist_ok=True)
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    shutil.copyfile(obj, tmp)
+    if sha256sum(tmp) != digest:
+        os.remove(tmp)
+        os.remove(obj)
+        raise ValueError(f"cached object {digest} was modified; removed it, fetch again")
+    os.replace(tmp, dest)
+
+
+def _source(dataset, mirror):
+    if mirror:
+        return urllib.parse.urljoin(mirror.rstrip("/") + "/", urllib.parse.quote(dataset.dest))
+    return dataset.url
+
+
+def _download(url, cached, cache, timeout):
+    """
+    GET url, conditionally if we've seen it before.
+
+    Returns (digest, index entry, status) where status is "downloaded" or
+    "not modified".
+    """
+    headers = {"User-Agent": USER_AGENT}
+    if cache.has(cached.get("sha256")):
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last-modified"):
+            headers["If-Modified-Since"] = cached["last-modified"]
+    request = urllib.request.Request(url, headers=headers)
+    try:
+        response = urllib.request.urlopen(request, timeout=timeout)
+    except urllib.error.HTTPError as exc:
+        if exc.code == 304:
+            return cached["sha256"], cached, "not modified"
+        raise
+    tmp = os.path.join(cache.path, "objects", f"download.{os.getpid()}.{id(request)}.tmp")
+    h = hashlib.sha256()
+    try:
+        with response, open(tmp, "wb") as f:
+            for block in iter(lambda: response.read(BLOCK), b""):
+                h.update(block)
+                f.write(block)
+        digest = h.hexdigest()
+        cache.add(tmp, digest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    entry = {
+        "sha256": digest,
+        "etag": response.headers.get("ETag"),
+        "last-modified": response.headers.get("Last-Modified"),
+    }
+    return digest, entry, "downloaded"
+
+
+def fetch_one(dataset, cache, mirror=None, timeout=60, root=ROOT):
+    """
+    Bring one dataset up to date. Returns (status, sha256, index entry).
+
+    The index entry is None when nothing new was learned about the URL. A
+    file at dest that this didn't put there is left alone, and so is the
+    existing file when a download fails its pinned checksum (ValueError).
+    """
+    dest = os.path.join(root, dataset.dest)
+    url = _source(dataset, mirror)
+    local = sha256sum(dest) if os.path.exists(dest) else None
+    cached = cache.index.get(url, {}) if url else {}
+    if local and local != cached.get("sha256"):
+        # put there by hand (or edited, like the EIA workbook): not ours to replace
+        return "present", local, None
+    if url is None:
+        raise LookupError("no url (exported by hand); fetch it from a --mirror")
+    entry = None
+    try:
+        digest, entry, status = _download(url, cached, cache, timeout)
+    except (urllib.error.URLError, OSError) as exc:
+        if not cache.has(cached.get("sha256")):
+            raise
+        digest, status = cached["sha256"], f"offline, using cache ({exc})"
+    if dataset.sha256 and digest != dataset.sha256:
+        raise ValueError(f"sha256 {digest} doesn't match the pinned {dataset.sha256}")
+    if local != digest:
+        _install(cache.object(digest), digest, dest)
+        if status == "not modified":
+            status = "restored from cache"
+    return status, digest, entry
+
+
+def fetch(datasets, cache=None, mirror=None, workers=8, timeout=60, root=ROOT):
+    """
+    Fetch datasets concurrently. Returns {name: (status, sha256 or None)}.
+
+    One dataset failing doesn't stop the others; its status is the error.
+    """
+    cache = cache or Cache()
+    results = {}
+    with concurrent.futures.ThreadPoolExecutor(workers) as pool:
+        futures = {pool.submit(fetch_one, d, cache, mirror, timeout, root): d for d in datasets}
+        for future in concurrent.futures.as_completed(futures):
+            dataset = futures[future]
+            try:
+                status, digest, entry = future.result()
+            except Exception as exc:
+                results[dataset.name] = (f"failed: {exc}", None)
+                continue
+            if entry is not None:
+                cache.index[_source(dataset, mirror)] = entry
+            results[dataset.name] = (status, digest)
+    cache.save()
+    return results
+
+
+def verify(datasets, root=ROOT):
+    """Check files on disk against their pinned checksums. Returns {name: problem or None}."""
+    problems = {}
+    for d in datasets:
+        dest = os.path.join(root, d.dest)
+        if not os.path.exists(dest):
+            problems[d.name] = "missing"
+        elif d.sha256 and sha256sum(dest) != d.sha256:
+            problems[d.name] = "checksum mismatch"
+        else:
+            problems[d.name] = None
+    return problems
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("names", nargs="*", help="datasets to fetch (default: all)")
+    parser.add_argument("--list", action="store_true", help="show the registry and what's on disk")
+    parser.add_argument("--verify", action="store_true", help="check files against pinned checksums")
+    parser.add_argument("--mirror", help="base URL to fetch every dest path from instead")
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--timeout", type=float, default=60)
+    args = parser.parse_args()
+
+    datasets = registry()
+    unknown = set(args.names) - set(datasets)
+    if unknown:
+        parser.error(f"unknown datasets: {', '.join(sorted(unknown))}")
+    chosen = [datasets[n] for n in (args.names or datasets)]
+
+    if args.list:
+        for d in chosen:
+            here = "ok     " if os.path.exists(os.path.join(ROOT, d.dest)) else "missing"
+            print(f"{here} {d.name:32} {d.dest}")
+            print(f"        {d.url or '(no url: ' + d.ref + ')'}")
+            if d.note:
+                print(f"        note: {d.note}")
+    elif args.verify:
+        problems = verify(chosen)
+        for name, problem in problems.items():
+            print(f"{name:32} {problem or 'ok'}")
+        raise SystemExit(any(problems.values()))
+    else:
+        results = fetch(chosen, mirror=args.mirror, workers=args.workers, timeout=args.timeout)
+        for name in sorted(results):
+            status, digest = results[name]
+            print(f"{name:32} {digest[:12] if digest else '-':12} {status}")
+        raise SystemExit(any(status.startswith("failed") for status, _digest in results.values()))
@@ -0,0 +1,164 @@
+"""
+Decay heat after shutdown.
+
+The fission-energy figure says the afterglow heat is why nuclear waste is
+hazardous. This computes how much of it there is: decay power versus time after
+shutdown for any operating history.
+
+The default method is the ANS-5.1-1979 23-group sum of exponentials for thermal
+fission of U-235 (no neutron capture correction). Way-Wigner is kept as a rough
+fallback since it's the one people can check on a calculator.
+
+Operating histories are piecewise-constant power levels. Everything is
+evaluated with array math so many histories and lots of time points go at once.
+"""
+import numpy as np
+import matplotlib.pyplot as plt
+
+# MeV recoverable per fission of U-235, used to turn fission rate into power
+Q_U235 = 200.0
+
+# ANS-5.1-1979 U-235 thermal fission fit. alpha (MeV/s per fission), lambda (1/s)
+ANS_U235 = np.array(
+    [
+        [6.5057e-01, 2.2138e01],
+        [5.1264e-01, 5.1587e-01],
+        [2.4384e-01, 1.9594e-01],
+        [1.3850e-01, 1.0314e-01],
+        [5.5440e-02, 3.3656e-02],
+        [2.2225e-02, 1.1681e-02],
+        [3.3088e-03, 3.5870e-03],
+        [9.3015e-04, 1.3930e-03],
+        [8.0943e-04, 6.2630e-04],
+        [1.9567e-04, 1.8906e-04],
+        [3.2535e-05, 5.4988e-05],
+        [7.5595e-06, 2.0958e-05],
+        [2.5232e-06, 1.0010e-05],
+        [4.9948e-07, 2.5438e-06],
+        [1.8531e-07, 6.6361e-07],
+        [2.6608e-08, 1.2290e-07],
+        [2.2398e-09, 2.7213e-08],
+        [8.1641e-12, 4.3714e-09],
+        [8.7797e-11, 7.5780e-10],
+        [2.5131e-14, 2.4786e-10],
+        [3.2176e-16, 2.2384e-13],
+        [4.5038e-17, 2.4600e-14],
+        [7.4791e-17, 1.5699e-14],
+    ]
+)
+
+HOUR = 3600.0
+DAY = 24 * HOUR
+YEAR = 365.25 * DAY
+
+
+def _history(powers, durations):
+    """
+    Normalize an operating history to 2-D arrays.
+
+    Returns (powers, starts, ends) with shape (histories, intervals), where
+    starts/ends are how long before shutdown each interval begins and ends. The
+    last interval is the one right before shutdown.
+    """
+    powers = np.atleast_2d(np.asarray(powers, dtype=float))
+    durations = np.atleast_2d(np.asarray(durations, dtype=float))
+    powers, durations = np.broadcast_arrays(powers, durations)
+    # cumulative time before shutdown, counted backwards from the last interval
+    ends = np.cumsum(durations[:, ::-1], axis=1)[:, ::-1] - durations
+    starts = ends + durations
+    return powers, ends, starts
+
+
+def decay_power(t, powers, durations, method="ans", q=Q_U235):
+    """
+    Decay power after shutdown.
+
+    Parameters
+    ----------
+    t : array
+        Seconds after shutdown, shape (N,).
+    powers : array
+        Fission power during each interval, shape (K,) or (H, K). Any units; the
+        result comes back in the same units.
+    durations : array
+        Length of each interval in seconds, broadcastable to ``powers``.
+    method : str
+        ``"ans"`` for the ANS-5.1 exponential sum or ``"way-wigner"``.
+    q : float
+        MeV per fission, only used by the ANS method.
+
+    Returns
+    -------
+    array of shape (H, N)
+    """
+    t = np.asarray(t, dtype=float)
+    powers, ends, starts = _history(powers, durations)
+    if method == "ans":
+        alpha, lam = ANS_U235.T
+        # The exponential sum separates into a per-history weight times a
+        # shared decay matrix, so this is one small matmul no matter how many
+        # time points there are.
+        weights = np.einsum(
+            "hk,hki->hi",
+            powers / q,
+            np.exp(-lam * ends[..., None]) - np.exp(-lam * starts[..., None]),
+        )
+        weights *= alpha / lam
+        return weights @ np.exp(-np.outer(lam, t))
+    elif method == "way-wigner":
+        # 0.0622 P [t^-0.2 - (t+T)^-0.2] superposed over each interval. Time
+        # must be positive for the power law so clamp to one second.
+        tt = np.maximum(t, 1.0)
+        early = (tt + ends[..., None]) ** -0.2
+        late = (tt + starts[..., None]) ** -0.2
+        return 0.0622 * np.einsum("hk,hkn->hn", powers, early - late)
+    raise ValueError(f"Unknown decay heat method {method}")
+
+
+def afterglow_fractions(times=(HOUR, DAY, YEAR), operating=3 * YEAR, method="ans"):
+    """Fraction of full power after steady operation, at a few quotable times."""
+    frac = decay_power(np.array(times), [1.0], [operating], method=method)
+    return dict(zip(times, frac[0]))
+
+
+def plot(fname="decay-heat.png"):
+    """Plot the afterglow for a few different operating histories."""
+    t = np.logspace(0, np.log10(10 * YEAR), 100000)
+    histories = [
+        ("1 day at full power", [1.0], [DAY]),
+        ("1 year at full power", [1.0], [YEAR]),
+        ("3 years at full power", [1.0], [3 * YEAR]),
+    ]
+    powers = np.zeros((len(histories), 1))
+    durations = np.zeros((len(histories), 1))
+    for i, (_label, p, d) in enumerate(histories):
+        powers[i] = p
+        durations[i] = d
+    ans = decay_power(t, powers, durations)
+    ww = decay_power(t, powers[-1:], durations[-1:], method="way-wigner")
+
+    fig, ax = plt.subplots(dpi=150, figsize=(8, 5))
+    for (label, _p, _d), frac in zip(histories, ans):
+        ax.loglog(t / HOUR, frac * 100, label=label)
+    ax.loglog(t / HOUR, ww[0] * 100, "k:", label="Way-Wigner (3 years)")
+
+    for when, label in [(HOUR, "1 hour"), (DAY, "1 day"), (YEAR, "1 year")]:
+        ax.axvline(when / HOUR, color="0.6", ls="--", lw=0.8)
+        ax.text(when / HOUR, 8, label, rotation=90, ha="right", va="top", size=8)
+
+    ax.set_xlabel("Time after shutdown (hours)")
+    ax.set_ylabel("Decay heat (% of full power)")
+    ax.set_title("Afterglow heat after a reactor shuts down")
+    ax.grid(alpha=0.3, ls="--", which="both")
+    ax.legend(loc="lower left")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    for when, frac in afterglow_fractions().items():
+        print(f"{when/HOUR:>10.0f} hours after shutdown: {frac*100:.3f}% of full power")
+    plot()
@@ -0,0 +1,252 @@
+"""
+Doppler broadening of pointwise cross sections.
+
+The slides point out that microscopic cross sections depend on temperature
+through the Doppler effect: the target nuclei are jiggling around, so the
+neutron sees a smeared-out resonance. This implements the exact SIGMA1 kernel
+(Cullen & Weisbin, Nucl. Sci. Eng. 60, 199 (1976)) for cross sections that are
+linear-linear between points, which is how ENDF pointwise data is meant to be
+read.
+
+In velocity units x = sqrt(A E / kT) the broadened cross section at y is
+
+    sigma(y) = 1/(y^2 sqrt(pi)) int x^2 sigma(x) [exp(-(x-y)^2) - exp(-(x+y)^2)] dx
+
+and on each panel x^2 sigma(x) is a polynomial in x, so the integral is a sum
+of closed-form error-function moments. Only panels within a few thermal
+widths of each target contribute. All (temperature, energy) targets are
+flattened into one batch and evaluated in padded windows, in chunks to keep
+memory bounded.
+
+Broadened grids get cached on disk keyed by nuclide, reaction, temperature and
+a hash of the input data.
+"""
+import hashlib
+import os
+
+import numpy as np
+from scipy.special import erf
+import matplotlib.pyplot as plt
+
+BOLTZMANN = 8.617333262e-5  # eV/K
+# beyond this many thermal widths the kernel is below exp(-16)
+WIDTH = 4.0
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "outreach-material",
+    "doppler",
+)
+_ROOT_PI = np.sqrt(np.pi)
+
+
+def _moments(a):
+    """F_n(a) = 1/sqrt(pi) int_0^a z^n exp(-z^2) dz for n = 0..4."""
+    a2 = a * a
+    ea = np.exp(-a2) / (2 * _ROOT_PI)
+    aea = a * ea
+    f0 = erf(a) / 2
+    f1 = 1 / (2 * _ROOT_PI) - ea
+    f2 = f0 / 2 - aea
+    f3 = f1 - a * aea
+    f4 = 1.5 * f2 - a2 * aea
+    return f0, f1, f2, f3, f4
+
+
+def _panel_integrals(energy, xs, slope, points, valid, e, y, root_alpha, sign):
+    """
+    Sum the kernel over the panels in ``idx`` for targets at (e, y).
+
+    ``sign`` is +1 for the exp(-(x-y)^2) term and -1 for exp(-(x+y)^2). The
+    polynomial coefficients are written relative to the target energy and
+    divided by y^2 up front so nothing huge cancels at high energy.
+    """
+    idx = np.minimum(points[:, :-1], len(slope) - 1)
+    e_lo = energy[idx]
+    s_lo = np.where(valid, xs[idx], 0.0)
+    slope = np.where(valid, slope[idx], 0.0)
+    e = e[:, None]
+    y = y[:, None]
+    # neighbouring panels share end points, so take moments at the points
+    moments = [np.diff(f, axis=1) for f in _moments(root_alpha[:, None] * np.sqrt(energy[points]) - sign * y)]
+    total = (s_lo + slope * (e - e_lo)) * moments[0]
+    total += sign * (2 * s_lo + slope * (4 * e - 2 * e_lo)) / y * moments[1]
+    total += (s_lo + slope * (6 * e - e_lo)) / y**2 * moments[2]
+    total += sign * 4 * slope * e / y**3 * moments[3]
+    total += slope * e / y**4 * moments[4]
+    return total.sum(axis=1)
+
+
+def _windows(lo, hi, npanels):
+    """
+    Pad variable-length panel ranges [lo, hi) into a matrix of end points.
+
+    Returns the point indices (one more column than panels) and a mask of
+    which panels are real.
+    """
+    width = max(int((hi - lo).max()), 1)
+    points = lo[:, None] + np.arange(width + 1)
+    valid = points[:, :-1] < hi[:, None]
+    return np.minimum(points, npanels), valid
+
+
+def _chunks(widths, chunk):
+    """Split sorted window widths into runs with at most ~chunk panels padded."""
+    start = 0
+    while start < len(widths):
+        stop = min(start + max(chunk // max(widths[start], 1), 1), len(widths))
+        while stop - start > 1 and widths[stop - 1] * (stop - start) > chunk:
+            stop = start + max(chunk // max(widths[stop - 1], 1), 1)
+        yield start, stop
+        start = stop
+
+
+def broaden(energy, xs, awr, temperatures, t0=0.0, chunk=50_000):
+    """
+    Doppler broaden pointwise data to each temperature.
+
+    Parameters
+    ----------
+    energy, xs : array
+        Pointwise cross section (eV, barns) at temperature ``t0``, linear-linear.
+    awr : float
+        Target mass in neutron masses (the AWR in ENDF).
+    temperatures : sequence
+        Temperatures in K. Each must be >= t0.
+
+        The data is taken as zero outside the grid, so the last few thermal
+        widths at either end come out low.
+    chunk : int
+        Rough cap on the number of (target, panel) pairs held in memory.
+
+    Returns
+    -------
+    array of shape (len(temperatures), len(energy))
+    """
+    energy = np.asarray(energy, dtype=float)
+    xs = np.asarray(xs, dtype=float)
+    temperatures = np.atleast_1d(np.asarray(temperatures, dtype=float))
+    if np.any(temperatures < t0):
+        raise ValueError(f"Can only broaden up from {t0} K")
+    out = np.empty((len(temperatures), len(energy)))
+    hot = temperatures > t0
+    out[~hot] = xs
+    if not hot.any():
+        return out
+
+    npanels = len(energy) - 1
+    root_e = np.sqrt(energy)
+    alpha = awr / (BOLTZMANN * (temperatures[hot] - t0))
+    # flatten every (temperature, energy) pair into one list of targets
+    ti, ei = np.meshgrid(np.arange(len(alpha)), np.arange(len(energy)), indexing="ij")
+    ti, ei = ti.ravel(), ei.ravel()
+    root_alpha = np.sqrt(alpha)[ti]
+    y = root_alpha * root_e[ei]
+    e = energy[ei]
+
+    # panels overlapping y +/- WIDTH, found in sqrt(E) space
+    lo = np.searchsorted(root_e, np.maximum(y - WIDTH, 0) / root_alpha, side="right") - 1
+    hi = np.searchsorted(root_e, (y + WIDTH) / root_alpha, side="left")
+    lo, hi = lo.clip(0, npanels), hi.clip(0, npanels)
+    # the exp(-(x+y)^2) term only reaches panels with x < WIDTH - y
+    hi2 = np.searchsorted(root_e, np.maximum(WIDTH - y, 0) / root_alpha, side="left").clip(0, npanels)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        slope = np.diff(xs) / np.diff(energy)
+    slope[~np.isfinite(slope)] = 0.0
+
+    result = np.zeros(len(y))
+    # bigger windows at high energy, so group targets by window width
+    order = np.argsort(hi - lo, kind="stable")
+    widths = (hi - lo)[order]
+    for start, stop in _chunks(widths, chunk):
+        sel = order[start:stop]
+        points, valid = _windows(lo[sel], hi[sel], npanels)
+        total = _panel_integrals(energy, xs, slope, points, valid, e[sel], y[sel], root_alpha[sel], 1)
+        near = hi2[sel] > 0
+        if near.any():
+            s2 = sel[near]
+            points, valid = _windows(np.zeros(len(s2), dtype=int), hi2[s2], npanels)
+            total[near] -= _panel_integrals(energy, xs, slope, points, valid, e[s2], y[s2], root_alpha[s2], -1)
+        result[sel] = total
+
+    out[hot] = result.reshape(len(alpha), len(energy))
+    return out
+
+
+def _cache_name(nuclide, mt, temperature, digest, cache_dir):
+    return os.path.join(cache_dir, f"{nuclide}-mt{mt}-{temperature:.1f}K-{digest}.npy")
+
+
+def broaden_cached(nuclide, mt, energy, xs, awr, temperatures, t0=0.0, cache_dir=CACHE_DIR):
+    """
+    Same as broaden(), but reuse grids already on disk.
+
+    Only the temperatures missing from the cache are computed, in one batch.
+    """
+    energy = np.asarray(energy, dtype=float)
+    xs = np.asarray(xs, dtype=float)
+    temperatures = np.atleast_1d(np.asarray(temperatures, dtype=float))
+    digest = hashlib.sha1(energy.tobytes() + xs.tobytes() + repr((awr, t0)).encode()).hexdigest()[:12]
+    names = [_cache_name(nuclide, mt, t, digest, cache_dir) for t in temperatures]
+    missing = [i for i, name in enumerate(names) if not os.path.exists(name)]
+    if missing:
+        fresh = broaden(energy, xs, awr, temperatures[missing], t0)
+        os.makedirs(cache_dir, exist_ok=True)
+        for i, row in zip(missing, fresh):
+            # write then rename so a half-written file is never picked up
+            tmp = names[i] + f".{os.getpid()}.tmp.npy"
+            np.save(tmp, row)
+            os.replace(tmp, names[i])
+    return np.array([np.load(name) for name in names])
+
+
+def breit_wigner(energy, e0=6.674, gamma_n=1.493e-3, gamma_g=23.0e-3, awr=236.006, spin_factor=1.0):
+    """
+    Single-level Breit-Wigner capture resonance at 0 K.
+
+    Defaults are the big 6.67 eV U-238 resonance, handy when there's no
+    evaluation around to read.
+    """
+    gamma = gamma_n + gamma_g
+    # peak cross section 4 pi / k^2 g Gn/G with k^2 in barns^-1
+    k2 = 2.0 * 1.00866 * 931.494e6 * e0 * (awr / (awr + 1)) ** 2 / (197.327e6 * 1e-15) ** 2 * 1e-28
+    sigma0 = 4 * np.pi / k2 * spin_factor * gamma_n / gamma
+    x = 2 * (energy - e0) / gamma
+    return sigma0 * gamma_g / gamma * np.sqrt(e0 / energy) / (1 + x**2)
+
+
+def plot(energy, xs, awr, nuclide, temperatures=(300, 600, 900, 1200, 1500), window=None, fname="doppler-broadening.png"):
+    broadened = broaden_cached(nuclide, 102, energy, xs, awr, temperatures)
+    fig, ax = plt.subplots(figsize=(8, 5), dpi=150)
+    ax.plot(energy, xs, "k-", lw=1, label="0 K")
+    colors = plt.cm.inferno(np.linspace(0.2, 0.8, len(temperatures)))
+    for t, row, color in zip(temperatures, broadened, colors):
+        ax.plot(energy, row, color=color, label=f"{t:.0f} K")
+    ax.set_yscale("log")
+    if window:
+        ax.set_xlim(window)
+    ax.set_xlabel("Neutron energy (eV)")
+    ax.set_ylabel("Capture cross section (barns)")
+    ax.set_title(f"Doppler broadening flattens resonances ({nuclide})")
+    ax.grid(alpha=0.3, ls="--", which="both")
+    ax.legend()
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    import sys
+
+    if len(sys.argv) > 1:
+        from endf import Evaluation, ELEMENTS
+
+        with Evaluation(sys.argv[1]) as ev:
+            z, a, awr = ev.nuclide()
+            energy, xs = ev.cross_section(102)
+        plot(energy, xs, awr, f"{ELEMENTS.get(z, z)}{a}", window=(1, 100))
+    else:
+        energy = np.linspace(5.0, 8.5, 4001)
+        plot(energy, breit_wigner(energy), 236.006, "U238-SLBW", window=(6.2, 7.2))
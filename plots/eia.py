@@ -0,0 +1,167 @@
+"""
+Cached monthly EIA tables.
+
+EIA's Monthly Energy Review tables (like Table 8.1, Nuclear Energy Overview)
+only ever grow by a month at the end. Reading the whole workbook with pandas
+every run is slow, so the first read is saved as a columnar .npz under
+CACHE_DIR (named for the workbook and sheet, so a newer download of the same
+table picks up where the last one left off). After that:
+
+* same workbook as last time: just the .npz is loaded
+* a newer workbook: its rows are streamed with openpyxl's read-only reader,
+  rows already in the cache are skipped except the last REVISED months,
+  which are read again and checked against the cache (EIA revises recent
+  months), and only the new months are parsed and appended. Any mismatch
+  reads the whole sheet again.
+
+rolling() then gives 12-month mean/min/max and year-over-year change for
+every numeric column at once.
+"""
+import datetime
+import os
+
+import numpy as np
+
+DATE_COLUMN = "Month"
+# trailing months re-read and compared on every update
+REVISED = 24
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "outreach-material",
+    "eia",
+)
+
+
+def _cache_name(fname, sheet):
+    root, _ext = os.path.splitext(os.path.basename(fname))
+    return os.path.join(CACHE_DIR, f"{root}-{sheet}.npz")
+
+
+def _stamp(fname):
+    stat = os.stat(fname)
+    return np.array([stat.st_mtime_ns, stat.st_size])
+
+
+def _month(value):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return np.datetime64(f"{value.year:04d}-{value.month:02d}", "M")
+    return np.datetime64(str(value).strip()[:7], "M")
+
+
+def _number(value):
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        # EIA uses "NA", "--" and blanks for missing
+        return np.nan
+
+
+def _read_rows(fname, sheet, skip=0):
+    """
+    Stream (header, rows) from a sheet, skipping ``skip`` data rows.
+
+    The header is the first row whose first cell is "Month". Rows stop at
+    the first blank month.
+    """
+    import openpyxl
+
+    book = openpyxl.load_workbook(fname, read_only=True, data_only=True)
+    try:
+        rows = book[sheet].iter_rows(values_only=True)
+        for row in rows:
+            if row and row[0] == DATE_COLUMN:
+                # blank header cells keep their place so later names line up
+                header = ["" if h is None else str(h).strip() for h in row]
+                while header and not header[-1]:
+                    header.pop()
+                break
+        else:
+            raise ValueError(f"No '{DATE_COLUMN}' header in {fname} [{sheet}]")
+        data = []
+        for i, row in enumerate(rows):
+            if not row or row[0] is None:
+                break
+            if i < skip:
+                continue
+            data.append(row[: len(header)])
+        return header, data
+    finally:
+        book.close()
+
+
+def _columns(header, rows):
+    months = np.array([_month(r[0]) for r in rows], dtype="datetime64[M]")
+    values = np.array([[_number(v) for v in r[1:]] for r in rows], dtype=float).reshape(len(rows), len(header) - 1)
+    return months, values
+
+
+def load_table(fname, sheet="Nick", cache=None):
+    """
+    Return (months, values, names) for a monthly EIA sheet.
+
+    ``months`` is datetime64[M], ``values`` is (months, columns) float with
+    NaN for missing, and ``names`` labels the columns.
+    """
+    cache = cache or _cache_name(fname, sheet)
+    stamp = _stamp(fname)
+    skip = overlap = 0
+    if os.path.exists(cache):
+        with np.load(cache) as saved:
+            months, values, names = saved["months"], saved["values"], list(saved["names"])
+            if np.array_equal(saved["stamp"], stamp):
+                return months, values, names
+        # read the last few cached months again to catch revisions
+        overlap = min(REVISED, len(months))
+        skip = len(months) - overlap
+
+    header, rows = _read_rows(fname, sheet, skip)
+    new_months, new_values = _columns(header, rows)
+    if overlap:
+        old_months, old_values = months[skip:], values[skip:]
+        same = (
+            header[1:] == names
+            and len(new_months) >= overlap
+            and np.array_equal(new_months[:overlap], old_months)
+            and np.array_equal(new_values[:overlap], old_values, equal_nan=True)
+        )
+        if same:
+            months = np.concatenate((months[:skip], new_months))
+            values = np.concatenate((values[:skip], new_values))
+        else:
+            # columns changed or history was revised: start over
+            header, rows = _read_rows(fname, sheet)
+            months, values = _columns(header, rows)
+    else:
+        months, values = new_months, new_values
+    names = header[1:]
+
+    os.makedirs(os.path.dirname(os.path.abspath(cache)), exist_ok=True)
+    tmp = cache + f".{os.getpid()}.tmp.npz"
+    np.savez(tmp, months=months, values=values, names=np.array(names), stamp=stamp)
+    os.replace(tmp, cache)
+    return months, values, names
+
+
+def rolling(values, window=12):
+    """
+    Rolling statistics for every column in one go.
+
+    Returns a dict of (months, columns) arrays: "mean", "min", "max" over the
+    trailing ``window`` months, "change" (value minus the same month a year
+    earlier) and "percent change". Leading entries without enough history
+    are NaN, like pandas.
+    """
+    values = np.asarray(values, dtype=float)
+    n = len(values)
+    out = {key: np.full(values.shape, np.nan) for key in ("mean", "min", "max", "change", "percent change")}
+    if n >= window:
+        # (months - window + 1, columns, window) view, no copy
+        windows = np.lib.stride_tricks.sliding_window_view(values, window, axis=0)
+        out["mean"][window - 1:] = windows.mean(axis=-1)
+        out["min"][window - 1:] = windows.min(axis=-1)
+        out["max"][window - 1:] = windows.max(axis=-1)
+    if n > 12:
+        out["change"][12:] = values[12:] - values[:-12]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            out["percent change"][12:] = 100 * out["change"][12:] / values[:-12]
+    return out
@@ -0,0 +1,227 @@
+"""
+Minimal ENDF-6 reader.
+
+Evaluations come from e.g. https://www.nndc.bnl.gov/endf/ as 80-column text
+files. Every line ends with its MAT/MF/MT numbers, so one pass over those
+columns tells us where every section lives. We memory-map the file, index the
+section byte offsets once, and only parse the sections someone asks for.
+
+Only the handful of record types we actually use are implemented (CONT, LIST,
+TAB1). See the ENDF-6 Formats Manual (BNL-90365-2009) for the gory details.
+"""
+import mmap
+import re
+
+import numpy as np
+
+# Columns of the MAT (67-70), MF (71-72) and MT (73-75) fields in each line
+_ID_COLS = np.arange(66, 75)
+_ID_WEIGHTS = np.array([1000, 100, 10, 1, 10, 1, 100, 10, 1])
+# ENDF writes floats like 1.234567+5 with no 'e'
+_EXPONENT = re.compile(rb"(?<=[0-9.])([+-])")
+
+# MF=1/MT=458 components, in file order
+FISSION_ENERGY_COMPONENTS = [
+    ("EFR", "Fission fragments"),
+    ("ENP", "Prompt neutrons"),
+    ("END", "Delayed neutrons"),
+    ("EGP", "Prompt gammas"),
+    ("EGD", "Delayed gammas"),
+    ("EB", "Delayed betas"),
+    ("ENU", "Neutrinos"),
+    ("ER", "Total less neutrinos"),
+    ("ET", "Total"),
+]
+
+ELEMENTS = {90: "Th", 91: "Pa", 92: "U", 93: "Np", 94: "Pu", 95: "Am", 96: "Cm"}
+
+
+def _floats(block):
+    """Turn a chunk of 66-column ENDF data into a flat float array."""
+    # Fields are fixed width and negative numbers can butt right up against
+    # the previous field, so split on columns rather than whitespace.
+    fields = [block[i : i + 11].strip() or b"0" for i in range(0, len(block), 11)]
+    return np.array(_EXPONENT.sub(rb"e\1", b" ".join(fields)).split(), dtype=float)
+
+
+def _cont(line):
+    """Read a CONT/HEAD record: C1, C2, L1, L2, N1, N2."""
+    vals = [line[i : i + 11].strip() for i in range(0, 66, 11)]
+    c1, c2 = (float(_EXPONENT.sub(rb"e\1", v) or 0.0) for v in vals[:2])
+    return (c1, c2) + tuple(int(v or 0) for v in vals[2:])
+
+
+class Section:
+    """The raw lines of one MAT/MF/MT section with cursor-style record readers."""
+
+    def __init__(self, mat, mf, mt, lines):
+        self.mat = mat
+        self.mf = mf
+        self.mt = mt
+        self.lines = lines
+        self.pos = 0
+
+    def __repr__(self):
+        return f"<Section MAT={self.mat} MF={self.mf} MT={self.mt} ({len(self.lines)} lines)>"
+
+    def cont(self):
+        rec = _cont(self.lines[self.pos])
+        self.pos += 1
+        return rec
+
+    def _values(self, n):
+        nlines = -(-n // 6)
+        block = b"".join(line[:66].ljust(66) for line in self.lines[self.pos : self.pos + nlines])
+        self.pos += nlines
+        # the last line of a record is padded with blank fields
+        return _floats(block)[:n]
+
+    def list(self):
+        """Read a LIST record. Returns the CONT header and the NPL values."""
+        head = self.cont()
+        return head, self._values(head[4])
+
+    def tab1(self):
+        """Read a TAB1 record. Returns the CONT header, interpolation table, x and y."""
+        head = self.cont()
+        nr, npts = head[4], head[5]
+        interp = self._values(2 * nr).astype(int).reshape(nr, 2)
+        xy = self._values(2 * npts).reshape(npts, 2)
+        return head, interp, xy[:, 0], xy[:, 1]
+
+
+class Evaluation:
+    """
+    An ENDF-6 file, indexed by section.
+
+    Use as a context manager or call close() to release the memory map.
+    """
+
+    def __init__(self, fname):
+        self.fname = fname
+        self._file = open(fname, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.index = self._build_index()
+        self._parsed = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    def _build_index(self):
+        """Map (MAT, MF, MT) to (start, stop) byte offsets in one vectorized scan."""
+        buf = np.frombuffer(self._map, dtype=np.uint8)
+        ends = np.flatnonzero(buf == ord("\n"))
+        if len(buf) and buf[-1] != ord("\n"):
+            ends = np.append(ends, len(buf))
+        starts = np.concatenate(([0], ends[:-1] + 1))
+        # skip anything too short to carry an ID (e.g. blank trailing lines)
+        ok = ends - starts >= 75
+        starts, ends = starts[ok], ends[ok]
+
+        chars = buf[starts[:, None] + _ID_COLS].astype(int) - ord("0")
+        spaces = chars == ord(" ") - ord("0")
+        # negative MAT on the TEND line and any other junk drops out here
+        valid = np.all((chars >= 0) & (chars <= 9) | spaces, axis=1)
+        digits = np.where(spaces, 0, chars) * _ID_WEIGHTS
+        mat = digits[:, 0:4].sum(axis=1)
+        mf = digits[:, 4:6].sum(axis=1)
+        mt = digits[:, 6:9].sum(axis=1)
+        # SEND/FEND/MEND lines have MT or MF of zero and aren't section data
+        keep = valid & (mat > 0) & (mf > 0) & (mt > 0)
+        starts, ends = starts[keep], ends[keep]
+        ids = np.stack((mat[keep], mf[keep], mt[keep]), axis=1)
+
+        if not len(ids):
+            return {}
+        change = np.flatnonzero(np.any(ids[1:] != ids[:-1], axis=1)) + 1
+        first = np.concatenate(([0], change))
+        last = np.concatenate((change - 1, [len(ids) - 1]))
+        return {
+            tuple(int(v) for v in ids[f]): (int(starts[f]), int(ends[l]))
+            for f, l in zip(first, last)
+        }
+
+    @property
+    def materials(self):
+        return sorted({mat for mat, _mf, _mt in self.index})
+
+    def _key(self, mf, mt, mat=None):
+        if mat is None:
+            mats = self.materials
+            if len(mats) != 1:
+                raise ValueError(f"{self.fname} has materials {mats}; specify mat")
+            mat = mats[0]
+        key = (mat, mf, mt)
+        if key not in self.index:
+            raise KeyError(f"No MF={mf} MT={mt} for MAT={mat} in {self.fname}")
+        return key
+
+    def section(self, mf, mt, mat=None):
+        """Get a fresh Section for reading. Only these bytes are touched."""
+        key = self._key(mf, mt, mat)
+        start, stop = self.index[key]
+        return Section(*key, self._map[start:stop].splitlines())
+
+    def _cached(self, name, mf, mt, mat, reader):
+        key = (name,) + self._key(mf, mt, mat)
+        if key not in self._parsed:
+            self._parsed[key] = reader(self.section(mf, mt, mat))
+        return self._parsed[key]
+
+    def nuclide(self, mat=None):
+        """Return (Z, A, AWR) from the MF=1/MT=451 header."""
+
+        def read(sec):
+            za, awr = sec.cont()[:2]
+            return int(za) // 1000, int(za) % 1000, awr
+
+        return self._cached("nuclide", 1, 451, mat, read)
+
+    def fission_energy_release(self, mat=None):
+        """
+        Components of energy release per fission from MF=1/MT=458 in eV.
+
+        Returns a dict of code -> (value, uncertainty) for the constant term of
+        the energy-dependent fit (i.e. the thermal value).
+        """
+
+        def read(sec):
+            sec.cont()
+            _head, vals = sec.list()
+            pairs = vals[:18].reshape(9, 2)
+            return {code: tuple(pair) for (code, _label), pair in zip(FISSION_ENERGY_COMPONENTS, pairs)}
+
+        return self._cached("458", 1, 458, mat, read)
+
+    def cross_section(self, mt, mat=None):
+        """Pointwise (energy in eV, barns) from MF=3 for reaction MT."""
+
+        def read(sec):
+            sec.cont()
+            _head, _interp, energy, xs = sec.tab1()
+            return energy, xs
+
+        return self._cached("xs", 3, mt, mat, read)
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    for fname in sys.argv[1:]:
+        t0 = time.perf_counter()
+        with Evaluation(fname) as ev:
+            t1 = time.perf_counter()
+            z, a, _awr = ev.nuclide()
+            print(f"{fname}: {ELEMENTS.get(z, z)}-{a}, {len(ev.index)} sections indexed in {(t1-t0)*1e3:.1f} ms")
+            if (ev.materials[0], 1, 458) in ev.index:
+                for code, (val, err) in ev.fission_energy_release().items():
+                    print(f"  {code:>4} {val/1e6:8.3f} +/- {err/1e6:.3f} MeV")
+                print(f"  MF=1/MT=458 parsed in {(time.perf_counter()-t1)*1e3:.1f} ms")
@@ -1,18 +1,45 @@
+"""
+Where the energy from fission goes.
+
+Reads the MF=1/MT=458 fission energy release components straight out of an
+ENDF-6 evaluation (e.g. n-092_U_235.endf from https://www.nndc.bnl.gov/endf/).
+Pass a different evaluation on the command line to get the same figure for
+U-233, Pu-239, Pu-241, Th-232, etc.
+"""
+import sys
 
 import matplotlib.pyplot as plt
 import numpy as np
 
-labels = []
-energy = []
-with open('../data/u235-endf71-fission-energy.csv') as f:
-    for line in f:
-        data = line.split(',')
-        labels.append(data[0])
-        energy.append(float(data[1])/1e6)
+from decay_heat import afterglow_fractions, DAY
+from endf import Evaluation, ELEMENTS
+
+# prompt | delayed | neutrinos, in the order they're plotted
+COMPONENTS = [
+    ("EFR", "Fission fragments"),
+    ("ENP", "Prompt neutrons"),
+    ("EGP", "Prompt gammas"),
+    ("END", "Delayed neutrons"),
+    ("EGD", "Delayed gammas"),
+    ("EB", "Delayed betas"),
+    ("ENU", "Neutrinos"),
+]
+NEUTRON_MASS = 1.67492749804e-27  # kg, AWR is in units of this
+MEV = 1.602176634e-13  # J
+
+fname = sys.argv[1] if len(sys.argv) > 1 else '../data/endf/n-092_U_235.endf'
+with Evaluation(fname) as ev:
+    z, a, awr = ev.nuclide()
+    release = ev.fission_energy_release()
+element = ELEMENTS.get(z, str(z))
+
+labels = [label for _code, label in COMPONENTS]
+energy = [release[code][0]/1e6 for code, _label in COMPONENTS]
 
+# energy from fissioning every atom in 1 kg, in MWd (~950 for U235)
 total = sum(energy)
-# 950 MWd/kg max U235
-energy = [e/total*950 for e in energy]
+mwd_per_kg = total*MEV/(awr*NEUTRON_MASS)/86400/1e6
+energy = [e/total*mwd_per_kg for e in energy]
 
 fig, ax = plt.subplots(dpi=150, figsize=(8,5))
 width= 0.35
@@ -42,7 +69,7 @@ for bar in bars:
 
 ax.set_ylabel("Energy released (megawatt days)")
 #ax.set_xlabel("Radiation type")
-plt.title("Energy release from fission of 1 kg $^{235}$Uranium")
+plt.title(f"Energy release from fission of 1 kg $^{{{a}}}${element}")
 plt.xticks(rotation=50, ha="right")
 props = dict(boxstyle='round', facecolor='wheat', alpha=0.5)
 props2 = dict(boxstyle='round', facecolor='skyblue', alpha=0.5)
@@ -54,8 +81,12 @@ ax.text(4,600,
         "after reactor shutdown", 
         va='center', ha='center', bbox=props, fontsize="10")
 
+# decay_heat only has the U-235 fit, so say so when plotting anything else
+afterglow = afterglow_fractions([DAY])[DAY]
+fuel = "" if (z, a) == (92, 235) else ",\nfor U-235"
 ax.text(4,200,
-        "This afterglow heat\nis why nuclear\nwaste is hazardous",
+        "This afterglow heat\nis why nuclear\nwaste is hazardous\n"
+        f"({afterglow*100:.1f}% of full power\n1 day after shutdown{fuel})",
         va='center', ha='center', fontweight='bold',bbox=props2, fontsize="10")
 
 ax.text(6,600,
@@ -63,5 +94,5 @@ ax.text(6,600,
         va='center', ha='center', bbox=props, fontsize="10")
 
 fig.subplots_adjust(bottom=0.25, top=0.95)
-plt.savefig('fission-energy.svg')
+plt.savefig('fission-energy.svg' if (z, a) == (92, 235) else f'fission-energy-{element}{a}.svg')
 #plt.show()
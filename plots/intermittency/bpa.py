@@ -0,0 +1,51 @@
+"""
+Load generation and load data from BPA
+
+https://transmission.bpa.gov/Business/Operations/Wind/default.aspx
+
+The yearly WindGenTotalLoadYTD_<year>.xls files have one 5-minute row per
+timestamp (Pacific local time, column 'Date/Time') split across two sheets.
+"""
+import pandas as pd
+
+COLUMNS = {
+    'TOTAL WIND GENERATION  IN BPA CONTROL AREA (MW; SCADA 79687)': 'Wind',
+    'TOTAL HYDRO GENERATION (MW; SCADA 79682)': 'Hydro',
+    'TOTAL FOSSIL/BIOMASS GENERATION (MW; SCADA 16377)': 'Fossil/Biomass',
+    'TOTAL NUCLEAR GENERATION (MW; 70681)': 'Nuclear',
+}
+SOURCES = ['Wind', 'Hydro', 'Nuclear', 'Fossil/Biomass']
+
+
+def _rename(column):
+    if column in COLUMNS:
+        return COLUMNS[column]
+    # SCADA point numbers in the load header have changed between years
+    if 'CONTROL AREA' in column and 'LOAD' in column:
+        return 'Load'
+    return column
+
+
+def load(fname, skiprows):
+    print('Loading {}...'.format(fname))
+    data1 = pd.read_excel(fname, "January-June", header=0, skiprows=range(skiprows))
+    data2 = pd.read_excel(fname, "July-December", header=0, skiprows=range(skiprows))
+    data = pd.concat([data1, data2])
+    data = data.rename(columns=_rename)
+    data = data.set_index(pd.to_datetime(data['Date/Time']))
+    data = data.dropna(thresh=len(data.columns)-4) # drop rows with all N/As
+    return data
+
+
+def load_clean(fname, skiprows, max_fill='30min'):
+    """
+    load() put on a regular 5-minute grid by clean.clean_frame().
+
+    Short gaps are interpolated and long ones left as NaN, so sums and
+    plots can skip them. Returns (data, clean.Cleaned).
+    """
+    from clean import clean_frame
+
+    data, result = clean_frame(load(fname, skiprows), ['Load'] + SOURCES, max_fill=max_fill)
+    print(result.report.summary())
+    return data, result
@@ -0,0 +1,272 @@
+"""
+Read CAISO day files.
+
+Exported from web interface at https://www.caiso.com/TodaysOutlook/Pages/supply.html
+
+Each file is one day: a header row of 5-minute times, then one row per series
+(e.g. "Demand (5 minute...)", "Day-ahead forecast", "Solar", "Wind", ...).
+Times are local (Pacific).
+
+process() results are memoized by a fingerprint of the day series and the
+scenario, so the scenes that all ask for the same season share one
+computation. See ScenarioCache.
+"""
+import collections
+import hashlib
+import json
+import os
+import csv
+import typing
+from datetime import datetime
+
+import numpy as np
+
+DATA_DIR = "data"
+CACHE_DIR = os.path.join(
+    os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache")),
+    "outreach-material",
+    "caiso",
+)
+DFMT = "%m/%d/%Y %H:%M"
+NUM_POINTS = 288  # b/c the data is messy
+# part of every fingerprint: bump it whenever process() (or anything it
+# calls) changes its results, so cached ones from before stop matching
+PROCESS_VERSION = 1
+
+
+def read_day(fname, prefix, data_dir=DATA_DIR):
+    """
+    Read one series out of a CAISO day file.
+
+    Returns (datetimes, MW) for the first row whose label starts with
+    ``prefix``, or None if there isn't one.
+    """
+    print(f"opening {fname}")
+    with open(os.path.join(data_dir, fname)) as f:
+        reader = csv.reader(f)
+        row = next(reader)  # grab header
+        # process row full of times
+        date = row[0].split()[1]
+        times = row[1:NUM_POINTS]
+        # convert to datetime objects
+        datetimes = [datetime.strptime(f"{date} {time}", DFMT) for time in times]
+
+        for row in reader:
+            if row[0].startswith(prefix):
+                print(f"Reading {row[0]}")
+                # blank cells are readings CAISO didn't get
+                mw = np.array([float(di) if di.strip() else np.nan for di in row[1:NUM_POINTS]])
+                return datetimes, mw
+            # lookahead estimate or another source. throw it away
+            print(f"Skipping {row[0]}")
+    return None
+
+
+def read_data(data_dir=DATA_DIR):
+    """
+    Read CAISO data
+
+    We need:
+    * Summer demand
+    * Winter demand
+    * Summer solar (mostly shape important)
+    * Winter solar (shape and peak/avg important for setting mag)
+    * Nuclear generation (assume 91% cf)
+    """
+    data = {}
+    data.update(_read_demand(data_dir))
+    data.update(_read_solar_supply(data_dir))
+    data.update(_read_nuclear_supply(data_dir))
+    return data
+
+
+def _read_demand(data_dir=DATA_DIR):
+    """Read summer and winter demand curves."""
+    data = {}
+    for label, fname in [
+        # ("Summer demand", "CAISO-demand-20200621.csv"),
+        ("Summer demand", "CAISO-demand-20190621.csv"),
+        ("Winter demand", "CAISO-demand-20191221.csv"),
+    ]:
+        data[label] = read_day(fname, "Demand (5", data_dir)
+    return data
+
+
+def _read_solar_supply(data_dir=DATA_DIR):
+    """Read how much solar comes in a day."""
+    data = {}
+    for label, fname in [
+        ("Summer solar", "CAISO-renewables-20190621.csv"),
+        ("Winter solar", "CAISO-renewables-20191221.csv"),
+    ]:
+        data[label] = read_day(fname, "Solar", data_dir)
+    return data
+
+
+def _read_nuclear_supply(data_dir=DATA_DIR):
+    return {}
+
+
+def _integrate_megawatts(mw):
+    """
+    Sum megawatts over a day and return GW*day. Assume 5 minute increments.
+
+    Missing (NaN) readings are taken to be like the rest of the day rather
+    than zero: the sum over good readings is scaled up by the coverage.
+    """
+    mw = np.array(mw, dtype=float)
+    good = ~np.isnan(mw)
+    if not good.any():
+        return np.nan
+    return np.sum(mw[good] * 5 / 60 / 24) / 1000 * len(mw) / np.count_nonzero(good)
+
+
+class Data(typing.NamedTuple):
+    time: np.ndarray
+    vals: np.ndarray
+    integral: np.ndarray
+    label: str
+    color: str
+    hatch: str = None
+    opacity: float = 1.0
+
+
+def fingerprint(data, season, nonelectric=False):
+    """
+    Hash of everything process() reads: the season's two series and the
+    flags, plus PROCESS_VERSION for the code itself.
+    """
+    digest = hashlib.sha1(repr((PROCESS_VERSION, season, bool(nonelectric))).encode())
+    for key in (f"{season} demand", f"{season} solar"):
+        times, mw = data[key]
+        digest.update(np.array(times, dtype="datetime64[s]").tobytes())
+        digest.update(np.asarray(mw, dtype=float).tobytes())
+    return digest.hexdigest()[:16]
+
+
+class ScenarioCache:
+    """
+    process() results by fingerprint: an in-memory LRU of at most
+    ``max_bytes`` of arrays, in front of optional .npz files in ``cache_dir``.
+
+    Cached arrays are read-only since every caller shares them.
+    """
+
+    def __init__(self, max_bytes=64 * 2**20, cache_dir=None):
+        self.max_bytes = max_bytes
+        self.cache_dir = cache_dir
+        self.nbytes = 0
+        self.hits = self.misses = 0
+        self._items = collections.OrderedDict()
+
+    def get(self, data, season, nonelectric=False):
+        key = fingerprint(data, season, nonelectric)
+        if key in self._items:
+            self._items.move_to_end(key)
+            self.hits += 1
+            return self._items[key]
+        result = self._read(key)
+        if result is None:
+            self.misses += 1
+            result = _process(data, season, nonelectric)
+            self._write(key, result)
+        self._store(key, result)
+        return result
+
+    def clear(self):
+        self._items.clear()
+        self.nbytes = 0
+
+    def _store(self, key, result):
+        for d in result:
+            for a in (d.time, d.vals):
+                a.setflags(write=False)
+        size = sum(d.time.nbytes + d.vals.nbytes for d in result)
+        if size > self.max_bytes:
+            return
+        self._items[key] = result
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _key, old = self._items.popitem(last=False)
+            self.nbytes -= sum(d.time.nbytes + d.vals.nbytes for d in old)
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"process-{key}.npz")
+
+    def _read(self, key):
+        if not self.cache_dir or not os.path.exists(self._path(key)):
+            return None
+        with np.load(self._path(key)) as saved:
+            meta = json.loads(str(saved["meta"]))
+            self.hits += 1
+            return tuple(
+                Data(saved[f"time{i}"], saved[f"vals{i}"], float(saved[f"integral{i}"]), *fields)
+                for i, fields in enumerate(meta)
+            )
+
+    def _write(self, key, result):
+        if not self.cache_dir:
+            return
+        os.makedirs(self.cache_dir, exist_ok=True)
+        arrays = {"meta": np.array(json.dumps([[d.label, d.color, d.hatch, d.opacity] for d in result]))}
+        for i, d in enumerate(result):
+            arrays.update({f"time{i}": d.time, f"vals{i}": d.vals, f"integral{i}": np.array(d.integral)})
+        # write then rename so a half-written file is never picked up
+        tmp = self._path(key) + f".{os.getpid()}.tmp.npz"
+        np.savez(tmp, **arrays)
+        os.replace(tmp, self._path(key))
+
+
+# set cache_dir=CACHE_DIR to keep results between sessions
+cache = ScenarioCache()
+
+
+def process(data, season, nonelectric=False):
+    """(demand, supply, scaled supply, non-electric) Data for a season, memoized."""
+    return cache.get(data, season, nonelectric)
+
+
+def _process(data, season, nonelectric=False):
+    demand_dt, demand_mw = data[f"{season} demand"]
+    demand_integral = _integrate_megawatts(demand_mw)
+    demand_gw = demand_mw/1000
+    demand_t = np.array([dt.time().hour + dt.time().minute / 60 for dt in demand_dt])
+    demand = Data(demand_t, demand_gw, demand_integral, f"{season} demand", "tan")
+
+    # factor in other 60% that is not electric
+    # gratuitously reduce primary energy assuming electric efficiency
+    # by 60%
+    # Today 40% of energy is electric so 60% is non-electric. But if we electrify
+    # everything let's assume the 60% chunk is itself reduced to 60%, or 36% of
+    # the original total. Then the total integral itself is also reduced to 40%+36%
+    # of the original (76%).  But since we're starting from electricity demand integral 
+    # we still have to increase the total
+    others_integral = demand_integral/0.4*0.6*0.6
+    total_integral = demand_integral  + others_integral
+    # flat line value in GW will equal integral in GWd since time is 1 day
+    others_gw = np.array([others_integral for dt in demand_dt])
+    others = Data(demand_t, others_gw, others_integral, "Transportation,Industry,Heating", "brown")
+
+    supply_dt, supply_mw = data[f"{season} solar"]
+    supply_t = np.array([dt.time().hour + dt.time().minute / 60 for dt in supply_dt])
+    supply_integral = _integrate_megawatts(supply_mw)
+    supply_gw = supply_mw/1000
+    supply = Data(
+        supply_t, supply_gw, supply_integral, f"{season} solar supply", "green"
+    )
+
+    if nonelectric:
+        factor = total_integral/supply_integral
+    else:
+        factor = demand_integral /supply_integral
+    scaled_gw = supply_gw * factor
+    scaled = Data(
+        supply_t,
+        scaled_gw,
+        supply_integral*factor,
+        f"{season} required supply",
+        "green",
+        "",
+        0.1,
+    )
+    return demand, supply, scaled, others
@@ -0,0 +1,186 @@
+"""
+Carbon intensity of a grid over time, from its generation mix.
+
+BPA's spreadsheets give MW from Wind, Hydro, Nuclear and Fossil/Biomass every
+5 minutes, and energy-sources.yaml has IPCC lifecycle emissions (min, median,
+max gCO2-eq/kWh) per technology. Multiplying one by the other gives the
+grid's carbon intensity at every step, with a low/median/high band.
+
+Counterfactuals are substitutions: "Fossil/Biomass generation comes from
+nuclear instead", "half the hydro is replaced by gas". Each scenario is a
+matrix S (columns x technologies) saying which technology each column's MWh
+are charged to, so a scenario's effective factor per column is S @ f. Stack
+K scenarios and the whole study (every step, every scenario, low/median/high)
+is a single (steps x columns) @ (columns x 3K) matrix product.
+
+    python carbon.py ../../data/bpa-wind-low/WindGenTotalLoadYTD_2017.xls --skiprows 21
+
+The low and high bands take every technology at its low (or high) end at
+once, so they're the outer envelope, not a confidence interval.
+"""
+import argparse
+import os
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+import yaml
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCES_YAML = os.path.join(HERE, "..", "..", "data", "energy-sources.yaml")
+STATS = ("min", "median", "max")
+STEP_HOURS = 5 / 60
+
+# which IPCC technology each BPA column is charged to by default
+TECHNOLOGY = {
+    "Wind": "wind onshore",
+    "Hydro": "hydropower",
+    "Nuclear": "nuclear",
+    # BPA's thermal plants are mostly gas-fired
+    "Fossil/Biomass": "natural gas",
+}
+
+
+class Scenario(typing.NamedTuple):
+    name: str
+    # {column: {technology: fraction}}; columns not listed keep their default
+    moves: dict = {}
+
+
+BASELINE = Scenario("As generated")
+SCENARIOS = [
+    BASELINE,
+    Scenario("Fossil/Biomass from nuclear", {"Fossil/Biomass": {"nuclear": 1.0}}),
+    Scenario("Nuclear from gas", {"Nuclear": {"natural gas": 1.0}}),
+    Scenario("Half of hydro from gas", {"Hydro": {"hydropower": 0.5, "natural gas": 0.5}}),
+]
+
+
+class Factors(typing.NamedTuple):
+    technologies: list
+    values: np.ndarray  # (technologies, 3): min, median, max in gCO2-eq/kWh
+    units: str
+
+
+class Intensity(typing.NamedTuple):
+    times: np.ndarray
+    scenarios: list  # names
+    intensity: np.ndarray  # (steps, scenarios, 3) gCO2-eq/kWh
+    emissions: np.ndarray  # (steps, scenarios, 3) tCO2-eq per hour
+    generation: np.ndarray  # (steps,) MW
+
+
+def load_factors(fname=SOURCES_YAML):
+    with open(fname) as f:
+        data = yaml.safe_load(f)["lifecycle emissions"]
+    technologies = list(data["val"])
+    return Factors(technologies, np.array([data["val"][t] for t in technologies], dtype=float), data["units"])
+
+
+def substitution(scenario, columns, technologies, default=TECHNOLOGY):
+    """The (columns, technologies) matrix for one scenario. Rows sum to 1."""
+    matrix = np.zeros((len(columns), len(technologies)))
+    for i, column in enumerate(columns):
+        moves = scenario.moves.get(column, {default[column]: 1.0})
+        total = sum(moves.values())
+        if not np.isclose(total, 1.0):
+            raise ValueError(f"{scenario.name}: {column} fractions add up to {total}, not 1")
+        for technology, fraction in moves.items():
+            matrix[i, technologies.index(technology)] = fraction
+    return matrix
+
+
+def effective_factors(scenarios, columns, factors):
+    """(columns, scenarios * 3) gCO2-eq/kWh charged to each column's MWh."""
+    subs = np.stack([substitution(s, columns, factors.technologies) for s in scenarios])
+    # (K, C, T) @ (T, 3) -> (K, C, 3) -> (C, K*3)
+    return (subs @ factors.values).transpose(1, 0, 2).reshape(len(columns), -1)
+
+
+def carbon_intensity(times, generation, columns, scenarios=SCENARIOS, factors=None):
+    """
+    Intensity and emissions at every step under every scenario.
+
+    ``generation`` is (steps, columns) MW; missing readings count as zero.
+    Substitution moves energy between technologies, so total generation, and
+    the denominator of the intensity, is the same in every scenario.
+    """
+    factors = factors or load_factors()
+    gen = np.nan_to_num(np.asarray(generation, dtype=float))
+    eff = effective_factors(scenarios, columns, factors)
+    # MW * g/kWh = kg/h; / 1000 -> t/h
+    emissions = (gen @ eff).reshape(len(gen), len(scenarios), 3) / 1000
+    total = gen.sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        intensity = emissions * 1000 / total[:, None, None]
+    return Intensity(np.asarray(times), [s.name for s in scenarios], intensity, emissions, total)
+
+
+def annual(result, step_hours=STEP_HOURS):
+    """
+    {year: (scenarios, 3)} tonnes CO2-eq, and the average intensity per year.
+
+    Years are split with one reduceat over the sorted timestamps.
+    """
+    years = np.asarray(result.times, dtype="datetime64[Y]")
+    starts = np.flatnonzero(np.r_[True, years[1:] != years[:-1]])
+    tonnes = np.add.reduceat(result.emissions, starts, axis=0) * step_hours
+    mwh = np.add.reduceat(result.generation, starts) * step_hours
+    labels = years[starts].astype(int) + 1970
+    return (
+        {int(y): t for y, t in zip(labels, tonnes)},
+        {int(y): t * 1000 / m for y, t, m in zip(labels, tonnes, mwh)},
+    )
+
+
+def from_bpa(data, columns=tuple(TECHNOLOGY)):
+    """(times, generation, columns) from a bpa.load() frame."""
+    columns = [c for c in columns if c in data.columns]
+    return data.index.values, data[columns].values.astype(float), columns
+
+
+def plot(result, fname=None):
+    """Daily-mean intensity for each scenario, with the low/high envelope."""
+    days = np.asarray(result.times, dtype="datetime64[D]")
+    starts = np.flatnonzero(np.r_[True, days[1:] != days[:-1]])
+    # steps with no intensity (nothing generated) are left out of the mean
+    # rather than counted as zero; a day with none at all is a gap
+    ok = np.isfinite(result.intensity)
+    sums = np.add.reduceat(np.where(ok, result.intensity, 0.0), starts, axis=0)
+    counts = np.add.reduceat(ok.astype(int), starts, axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = sums / counts
+    dates = days[starts].astype(object)
+
+    fig, ax = plt.subplots(figsize=(12, 5), dpi=150)
+    for k, name in enumerate(result.scenarios):
+        line, = ax.plot(dates, daily[:, k, 1], lw=1.2, label=name)
+        ax.fill_between(dates, daily[:, k, 0], daily[:, k, 2], color=line.get_color(), alpha=0.15, lw=0)
+    ax.set_yscale("log")
+    ax.set_ylabel("Carbon intensity (gCO$_2$-eq/kWh)")
+    ax.set_title("Lifecycle carbon intensity of BPA generation (daily mean, IPCC min-max band)")
+    ax.grid(alpha=0.3, ls="--", which="both")
+    ax.legend(loc="upper left", fontsize="small")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("bpa", help="BPA WindGenTotalLoadYTD spreadsheet")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--fname", default=None)
+    args = parser.parse_args()
+
+    from bpa import load
+
+    result = carbon_intensity(*from_bpa(load(args.bpa, args.skiprows)))
+    tonnes, average = annual(result)
+    for year in tonnes:
+        for k, name in enumerate(result.scenarios):
+            lo, mid, hi = tonnes[year][k] / 1e6
+            print(f"{year} {name:30} {mid:8.2f} Mt CO2-eq ({lo:.2f}-{hi:.2f}), {average[year][k][1]:6.1f} g/kWh")
+    plot(result, args.fname)
@@ -0,0 +1,210 @@
+"""
+Clean up 5-minute grid data before anything gets summed or plotted.
+
+Raw BPA and CAISO series have holes (sensor dropouts, blank cells, whole
+missing days), the odd duplicated row, and local timestamps that repeat an
+hour every November and skip one every March. clean() puts the readings on a
+regular UTC grid in one pass and sorts out each kind of problem:
+
+* DST repeats: the second run through the fall-back hour is kept as the
+  standard-time hour it is, not treated as a duplicate
+* duplicates: a timestamp seen twice outside that hour; the first is kept
+* off-grid: timestamps not on the step are snapped to the nearest one
+* gaps: missing grid points or NaN readings, per column. Gaps up to
+  ``max_fill`` long are filled by linear interpolation; longer ones (and
+  gaps at either end, which have nothing to interpolate from) are left NaN
+  and flagged in ``masked``
+
+and keeps count in a Report. Anything integrating the result should skip
+NaN and scale by coverage (see coverage() and mean()) instead of treating
+a gap as zero output, and plots should break lines at gaps.
+
+    python clean.py ../../data/bpa-wind-low/WindGenTotalLoadYTD_2017.xls --skiprows 21
+"""
+import argparse
+import typing
+
+import numpy as np
+
+from resample import TZ, parse_step, repeats, to_local, utc_offsets
+
+MAX_FILL = "30min"
+
+
+class Report(typing.NamedTuple):
+    rows: int
+    grid_points: int
+    start: np.datetime64  # UTC
+    end: np.datetime64
+    step: np.timedelta64
+    duplicates: int
+    conflicting_duplicates: int  # duplicates whose values disagree
+    dst_repeats: int
+    dst_transitions: int
+    off_grid: int
+    missing: dict  # label -> grid points with no reading
+    filled: dict  # label -> interpolated points
+    masked: dict  # label -> points left NaN
+    long_gaps: list  # (label, start UTC, end UTC), longest first
+
+    def summary(self, limit=10):
+        lines = [
+            f"{self.rows} rows -> {self.grid_points} points every {self.step.astype(object)} "
+            f"from {self.start} to {self.end} UTC",
+            f"  {self.duplicates} duplicates ({self.conflicting_duplicates} with different values), "
+            f"{self.dst_repeats} DST repeats, {self.dst_transitions} DST transitions, {self.off_grid} off-grid",
+        ]
+        for label in self.missing:
+            lines.append(
+                f"  {label}: {self.missing[label]} missing, {self.filled[label]} filled, "
+                f"{self.masked[label]} masked ({100 * self.masked[label] / self.grid_points:.2f}%)"
+            )
+        for label, start, end in self.long_gaps[:limit]:
+            lines.append(f"  gap in {label}: {start} to {end} ({(end - start).astype('timedelta64[m]')})")
+        if len(self.long_gaps) > limit:
+            lines.append(f"  ... and {len(self.long_gaps) - limit} more gaps")
+        return "\n".join(lines)
+
+
+class Cleaned(typing.NamedTuple):
+    times: np.ndarray  # datetime64[s] UTC, regular
+    values: np.ndarray  # (times, columns), NaN where masked
+    filled: np.ndarray  # bool, interpolated
+    masked: np.ndarray  # bool, in a gap too long to fill
+    labels: list
+    report: Report
+
+    def local(self, tz=TZ):
+        """Wall-clock times, for plotting next to the raw data."""
+        return to_local(self.times, tz)
+
+    def coverage(self):
+        """Fraction of the grid with a value, per column."""
+        return 1 - self.masked.mean(axis=0)
+
+    def mean(self):
+        """Average of each column over the points that have values."""
+        return np.nanmean(self.values, axis=0)
+
+
+def _runs(missing):
+    """(column, first row, one past last row) of every run of True, by column."""
+    n, k = missing.shape
+    padded = np.zeros((k, n + 2), dtype=np.int8)
+    padded[:, 1:-1] = missing.T
+    edges = np.diff(padded, axis=1)
+    col, start = np.nonzero(edges == 1)
+    _col, end = np.nonzero(edges == -1)
+    return col, start, end
+
+
+def clean(times, values, labels=None, step="5min", max_fill=MAX_FILL, tz=TZ):
+    """
+    Regularize local-time readings onto a UTC grid. Returns Cleaned.
+
+    ``values`` is (rows, columns). ``tz`` is a zone name, or a fixed UTC
+    offset in hours for data logged in standard time all year.
+    """
+    local = np.asarray(times, dtype="datetime64[s]")
+    values = np.asarray(values, dtype=float).reshape(len(local), -1)
+    labels = list(labels) if labels is not None else [str(i) for i in range(values.shape[1])]
+    step = parse_step(step)
+    s = int(step.astype(np.int64))
+    max_steps = int(parse_step(max_fill).astype(np.int64)) // s
+
+    offsets = utc_offsets(local, tz)
+    ambiguous = offsets[0] != offsets[1]
+    again = repeats(local)
+    dst_repeat = again & ambiguous
+    utc = local - np.where(dst_repeat, offsets[1], offsets[0])
+    used = np.where(dst_repeat, offsets[1], offsets[0]).astype(np.int64)
+    transitions = int(np.count_nonzero(np.diff(used[np.argsort(utc, kind="stable")])))
+
+    t = utc.astype(np.int64)
+    t0 = t.min() // s * s
+    offset = t - t0
+    off_grid = int(np.count_nonzero(offset % s))
+    idx = (offset + s // 2) // s
+    n = int(idx.max()) + 1
+
+    # first reading at each grid point wins
+    order = np.argsort(idx, kind="stable")
+    sorted_idx = idx[order]
+    dup = np.r_[False, sorted_idx[1:] == sorted_idx[:-1]]
+    keep = order[~dup]
+    grid = np.full((n, values.shape[1]), np.nan)
+    grid[idx[keep]] = values[keep]
+    first, later = grid[sorted_idx], values[order]
+    same = (first == later) | (np.isnan(first) & np.isnan(later))
+    conflicting = int(np.count_nonzero(dup & ~same.all(axis=1)))
+
+    missing = np.isnan(grid)
+    col, start, end = _runs(missing)
+    interior = (start > 0) & (end < n)
+    short = interior & (end - start <= max_steps)
+    # mark rows inside short runs with +1/-1 at the ends and a cumsum
+    marks = np.zeros((n + 1, values.shape[1]), dtype=np.int32)
+    np.add.at(marks, (start[short], col[short]), 1)
+    np.add.at(marks, (end[short], col[short]), -1)
+    filled = np.cumsum(marks[:-1], axis=0) > 0
+    rows = np.arange(n)
+    for c in range(values.shape[1]):
+        if filled[:, c].any():
+            ok = ~missing[:, c]
+            grid[filled[:, c], c] = np.interp(rows[filled[:, c]], rows[ok], grid[ok, c])
+    masked = missing & ~filled
+
+    long_gap = ~short
+    order = np.argsort(-(end - start)[long_gap], kind="stable")
+    grid_times = (t0 + rows * s).astype("datetime64[s]")
+    gaps = [
+        (labels[c], grid_times[a], grid_times[b - 1] + step)
+        for c, a, b in zip(col[long_gap][order], start[long_gap][order], end[long_gap][order])
+    ]
+    report = Report(
+        rows=len(local),
+        grid_points=n,
+        start=grid_times[0],
+        end=grid_times[-1] + step,
+        step=step,
+        duplicates=int(np.count_nonzero(dup)),
+        conflicting_duplicates=conflicting,
+        dst_repeats=int(np.count_nonzero(dst_repeat)),
+        dst_transitions=transitions,
+        off_grid=off_grid,
+        missing=dict(zip(labels, missing.sum(axis=0).tolist())),
+        filled=dict(zip(labels, filled.sum(axis=0).tolist())),
+        masked=dict(zip(labels, masked.sum(axis=0).tolist())),
+        long_gaps=gaps,
+    )
+    return Cleaned(grid_times, grid, filled, masked, labels, report)
+
+
+def clean_frame(data, columns=None, **kwargs):
+    """
+    clean() a DataFrame with a local-time index (e.g. from bpa.load()).
+
+    Returns (DataFrame on the regular grid, indexed by local wall-clock
+    time, with NaN in long gaps; Cleaned).
+    """
+    import pandas as pd
+
+    columns = [c for c in (columns or data.columns) if c in data.columns]
+    numeric = data[columns].apply(pd.to_numeric, errors="coerce")
+    result = clean(data.index.values, numeric.values, columns, **kwargs)
+    frame = pd.DataFrame(result.values, index=pd.DatetimeIndex(result.local(kwargs.get("tz", TZ))), columns=columns)
+    return frame, result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("bpa", help="BPA WindGenTotalLoadYTD spreadsheet")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--max-fill", default=MAX_FILL)
+    args = parser.parse_args()
+
+    from bpa import load, SOURCES
+
+    data = load(args.bpa, args.skiprows)
+    _frame, result = clean_frame(data, ["Load"] + SOURCES, max_fill=args.max_fill)
+    print(result.report.summary())
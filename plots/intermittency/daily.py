@@ -0,0 +1,241 @@
+"""
+Daily summaries for an archive of CAISO day files, however many years long.
+
+    python daily.py archive/ --out caiso-daily.csv --workers 8
+    python daily.py archive/ --out caiso-daily.csv --plot caiso-daily.png
+
+Every CAISO-demand-YYYYMMDD.csv / CAISO-renewables-YYYYMMDD.csv pair is
+reduced to one DaySummary: energy, peak and minimum demand (and when), the
+biggest 3-hour evening ramp in net load (demand minus solar and wind), and
+the solar fraction. Nothing holds more than one day at a time. Directory
+listings are streamed, each file is read a row at a time and closed as soon
+as the rows we want have gone by, at most ``workers * 2`` days are in flight
+in the process pool, and each summary is written to the CSV as it comes back.
+Rerunning with the same --out skips days that are already there.
+"""
+import argparse
+import collections
+import concurrent.futures
+import csv
+import itertools
+import os
+import re
+import typing
+from datetime import datetime
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+from caiso import DFMT
+
+FNAME = re.compile(r"CAISO-(demand|renewables)-(\d{8})\.csv$")
+ROWS = {"demand": ("Demand (5",), "renewables": ("Solar", "Wind")}
+STEP_HOURS = 5 / 60
+RAMP_HOURS = 3
+# net-load ramps that start in this window (local hour) count as evening
+EVENING = (12, 21)
+
+
+class DaySummary(typing.NamedTuple):
+    date: str
+    energy_gwh: float
+    peak_mw: float
+    peak_time: str
+    min_mw: float
+    min_time: str
+    evening_ramp_mw: float  # largest RAMP_HOURS rise in demand - solar - wind
+    solar_fraction: float  # solar energy / demand energy
+
+
+def archive(data_dir):
+    """
+    Yield (date, {"demand": path, "renewables": path}) in date order.
+
+    Only file names are kept (a few dozen bytes per day), never contents.
+    """
+    days = collections.defaultdict(dict)
+    with os.scandir(data_dir) as entries:
+        for entry in entries:
+            match = FNAME.match(entry.name)
+            if match:
+                kind, date = match.groups()
+                days[date][kind] = entry.path
+    for date in sorted(days):
+        yield date, days.pop(date)
+
+
+def read_rows(fname, prefixes):
+    """
+    Stream a CAISO day file and return (times, {prefix: MW}) for the rows
+    whose labels start with ``prefixes``. Blank cells are NaN.
+    """
+    wanted = set(prefixes)
+    found = {}
+    with open(fname, newline="") as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        date = header[0].split()[1]
+        times = [datetime.strptime(f"{date} {t}", DFMT) for t in header[1:] if t]
+        for row in reader:
+            match = next((p for p in wanted if row and row[0].startswith(p)), None)
+            if match is None:
+                continue
+            found[match] = np.array([float(v) if v.strip() else np.nan for v in row[1:len(times) + 1]])
+            wanted.discard(match)
+            if not wanted:
+                # the rest is forecasts and other sources
+                break
+    return times, found
+
+
+def _ramp(net, hours=RAMP_HOURS, window=EVENING, times=None):
+    """Largest rise in ``net`` over ``hours`` starting within ``window``."""
+    lag = int(round(hours / STEP_HOURS))
+    if len(net) <= lag:
+        return np.nan
+    rise = net[lag:] - net[:-lag]
+    start_hour = np.array([t.hour + t.minute / 60 for t in times[:len(rise)]])
+    rise = rise[(start_hour >= window[0]) & (start_hour < window[1])]
+    return float(np.nanmax(rise)) if np.isfinite(rise).any() else np.nan
+
+
+def _energy(mw, n):
+    """
+    MWh over a day of ``n`` readings. Like caiso._integrate_megawatts, the
+    missing ones are taken to be like the rest of the day, not zero.
+    """
+    mw = np.asarray(mw, dtype=float)
+    good = np.count_nonzero(~np.isnan(mw))
+    return np.nansum(mw) * STEP_HOURS * n / good if good else np.nan
+
+
+def summarize_day(date, paths):
+    """Reduce one day's files to a DaySummary."""
+    times, rows = read_rows(paths["demand"], ROWS["demand"])
+    demand = rows.get("Demand (5")
+    if demand is None or np.isnan(demand).all():
+        raise ValueError(f"No demand in {paths['demand']}")
+    supply = {}
+    if "renewables" in paths:
+        _times, supply = read_rows(paths["renewables"], ROWS["renewables"])
+    n = len(demand)
+    solar = supply.get("Solar", np.zeros(n))[:n]
+    wind = supply.get("Wind", np.zeros(n))[:n]
+    net = demand - np.nan_to_num(solar) - np.nan_to_num(wind)
+
+    energy = _energy(demand, n)
+    peak = int(np.nanargmax(demand))
+    low = int(np.nanargmin(demand))
+    return DaySummary(
+        date=f"{date[:4]}-{date[4:6]}-{date[6:]}",
+        energy_gwh=round(energy / 1000, 3),
+        peak_mw=float(demand[peak]),
+        peak_time=times[peak].strftime("%H:%M"),
+        min_mw=float(demand[low]),
+        min_time=times[low].strftime("%H:%M"),
+        evening_ramp_mw=_ramp(net, times=times),
+        solar_fraction=round(_energy(solar, n) / energy, 5) if "Solar" in supply else np.nan,
+    )
+
+
+def _summarize(item):
+    """Pool worker: never raises, so one bad day doesn't stop the run."""
+    date, paths = item
+    try:
+        return summarize_day(date, paths)
+    except (OSError, ValueError, IndexError, StopIteration) as exc:
+        return date, f"{type(exc).__name__}: {exc}"
+
+
+def summaries(days, workers=None, ahead=2):
+    """
+    Yield DaySummary (or (date, error)) for each (date, paths), in order.
+
+    With ``workers`` the days fan out over a process pool, but only
+    ``workers * ahead`` are submitted at a time, so a huge archive doesn't
+    turn into a huge queue of pending futures.
+    """
+    days = iter(days)
+    if workers == 1:
+        yield from map(_summarize, days)
+        return
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        limit = (workers or os.cpu_count() or 1) * ahead
+        pending = collections.deque(pool.submit(_summarize, d) for d in itertools.islice(days, limit))
+        while pending:
+            result = pending.popleft().result()
+            for d in itertools.islice(days, 1):
+                pending.append(pool.submit(_summarize, d))
+            yield result
+
+
+def _done(fname):
+    """Dates already in an output CSV."""
+    if not os.path.exists(fname):
+        return set()
+    with open(fname, newline="") as f:
+        return {row["date"].replace("-", "") for row in csv.DictReader(f)}
+
+
+def run(data_dir, out, workers=None):
+    """Summarize every day in ``data_dir`` not already in ``out``, appending as we go."""
+    done = _done(out)
+    todo = ((date, paths) for date, paths in archive(data_dir) if date not in done and "demand" in paths)
+    new = not os.path.exists(out)
+    count = errors = 0
+    with open(out, "a", newline="") as f:
+        writer = csv.writer(f)
+        if new:
+            writer.writerow(DaySummary._fields)
+        for result in summaries(todo, workers):
+            if isinstance(result, DaySummary):
+                writer.writerow(result)
+                f.flush()
+                count += 1
+            else:
+                print("skipping {}: {}".format(*result))
+                errors += 1
+    return count, errors
+
+
+def load(fname):
+    """Read a summary CSV back as a dict of arrays, dates as datetime64[D]."""
+    with open(fname, newline="") as f:
+        rows = sorted(csv.DictReader(f), key=lambda r: r["date"])
+    data = {"date": np.array([r["date"] for r in rows], dtype="datetime64[D]")}
+    for field in ("energy_gwh", "peak_mw", "min_mw", "evening_ramp_mw", "solar_fraction"):
+        data[field] = np.array([float(r[field]) for r in rows])
+    return data
+
+
+def plot(data, fname=None):
+    fig, (ax1, ax2) = plt.subplots(2, 1, figsize=(12, 7), dpi=150, sharex=True)
+    dates = data["date"].astype(datetime)
+    ax1.plot(dates, data["peak_mw"] / 1000, color="tan", lw=1, label="Peak demand")
+    ax1.plot(dates, data["evening_ramp_mw"] / 1000, color="k", lw=1, label=f"{RAMP_HOURS}-hour evening net-load ramp")
+    ax1.set_ylabel("GW")
+    ax1.legend(loc="upper left")
+    ax1.grid(alpha=0.3, ls="--")
+    ax1.set_title("CAISO, one point per day")
+    ax2.plot(dates, data["solar_fraction"] * 100, color="green", lw=1)
+    ax2.set_ylabel("Solar share of demand (%)")
+    ax2.grid(alpha=0.3, ls="--")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("data_dir")
+    parser.add_argument("--out", default="caiso-daily.csv")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--plot", nargs="?", const="", default=None, help="plot the summaries (to a file if given)")
+    args = parser.parse_args()
+
+    count, errors = run(args.data_dir, args.out, args.workers)
+    print(f"{count} days summarized, {errors} skipped, in {args.out}")
+    if args.plot is not None:
+        plot(load(args.out), args.plot or None)
@@ -0,0 +1,204 @@
+"""
+Live grid dashboard for the booth.
+
+Replays 5-minute CAISO or BPA data from local files as if it were coming in
+live, at whatever speed you like (``--speed 3600`` is an hour of grid per
+second). Unlike anim-example.py nothing grows: the last ``--window`` hours live
+in a preallocated ring buffer, the axes never rescale, and only the lines and
+the clock get redrawn each frame (blitting). So the frame time at hour six of
+the demo is the same as at minute one.
+
+    python dashboard.py caiso data/CAISO-renewables-2019*.csv --series Solar Wind
+    python dashboard.py bpa ../../data/bpa-wind-low/WindGenTotalLoadYTD_2017.xls
+"""
+import argparse
+import os
+import time
+
+import numpy as np
+import matplotlib.pyplot as plt
+import matplotlib.animation as animation
+
+STEP = np.timedelta64(5, "m")
+
+
+class RingBuffer:
+    """
+    Fixed-size buffer of the last ``capacity`` rows.
+
+    Every row is written twice, ``capacity`` apart, so the newest ``capacity``
+    rows are always one contiguous slice: view() never copies.
+    """
+
+    def __init__(self, capacity, columns):
+        self.capacity = capacity
+        self._data = np.full((2 * capacity, columns), np.nan)
+        self._next = 0
+        self.size = 0
+
+    def push(self, rows):
+        """Append rows (n, columns); only the last ``capacity`` are kept."""
+        rows = np.atleast_2d(rows)[-self.capacity:]
+        idx = (self._next + np.arange(len(rows))) % self.capacity
+        self._data[idx] = rows
+        self._data[idx + self.capacity] = rows
+        self._next = (self._next + len(rows)) % self.capacity
+        self.size = min(self.size + len(rows), self.capacity)
+
+    def view(self):
+        """The buffered rows, oldest first."""
+        end = self._next + self.capacity
+        return self._data[end - self.size:end]
+
+
+class ReplayFeed:
+    """
+    A stand-in for a live feed, backed by arrays read from disk.
+
+    ``times`` is a datetime64 array and ``values`` is (len(times), series).
+    poll() hands back whatever rows have "arrived" since the last call, with
+    ``speed`` grid seconds passing per wall-clock second. At the end of the
+    data it starts over.
+    """
+
+    def __init__(self, times, values, labels, speed=600.0, clock=time.monotonic):
+        self.times = np.asarray(times, dtype="datetime64[s]")
+        self.values = np.asarray(values, dtype=float)
+        self.labels = list(labels)
+        self.speed = speed
+        self._clock = clock
+        self._start = clock()
+        self._sent = 0
+
+    def _due(self):
+        """How many rows should have arrived by now, counting loops."""
+        return int((self._clock() - self._start) * self.speed / STEP.astype("timedelta64[s]").astype(float)) + 1
+
+    def poll(self):
+        """Return (times, values) for rows that came in since last poll."""
+        due = self._due()
+        n = len(self.times)
+        start = self._sent
+        self._sent = due
+        # anything older than one full pass would be overwritten anyway
+        start = max(start, due - n)
+        idx = np.arange(start, due) % n
+        return self.times[idx], self.values[idx]
+
+    def now(self):
+        """The timestamp of the last row handed out."""
+        return self.times[(self._sent - 1) % len(self.times)]
+
+    @classmethod
+    def from_caiso(cls, fnames, series=("Demand (5", "Solar", "Wind"), **kwargs):
+        """
+        Stitch CAISO day files together.
+
+        Each series is looked up by row-label prefix in every file; a file
+        can be missing some (demand and renewables come in separate exports),
+        in which case days are matched up by timestamp.
+        """
+        from caiso import read_day
+
+        columns = {}
+        for fname in sorted(fnames):
+            for prefix in series:
+                day = read_day(os.path.basename(fname), prefix, data_dir=os.path.dirname(fname) or ".")
+                if day is not None:
+                    times, mw = day
+                    columns.setdefault(prefix, {}).update(zip(np.array(times, dtype="datetime64[s]"), mw))
+        labels = [s for s in series if s in columns]
+        if not labels:
+            raise ValueError("None of {} found in {}".format(series, fnames))
+        times = np.array(sorted(set().union(*(columns[s] for s in labels))))
+        values = np.array([[columns[s].get(t, np.nan) for s in labels] for t in times])
+        return cls(times, values, [s.split(" (")[0] for s in labels], **kwargs)
+
+    @classmethod
+    def from_bpa(cls, fname, skiprows=23, series=("Load", "Wind", "Hydro", "Nuclear"), **kwargs):
+        """Read a BPA WindGenTotalLoadYTD spreadsheet."""
+        from bpa import load
+
+        data = load(fname, skiprows)
+        labels = [s for s in series if s in data.columns]
+        return cls(data.index.values, data[labels].values, labels, **kwargs)
+
+
+def run(feed, window=24.0, fps=20, ylim=None, fname=None, frames=None):
+    """
+    Animate the feed with a ``window``-hour rolling view.
+
+    With ``fname`` the animation is written to disk for ``frames`` frames
+    instead of shown.
+    """
+    capacity = int(round(window * 12))
+    buffer = RingBuffer(capacity, len(feed.labels))
+    # x is fixed: hours before the latest reading
+    hours_ago = (np.arange(capacity) - capacity + 1) / 12.0
+
+    if ylim is None:
+        ylim = (0, np.nanmax(feed.values) * 1.1)
+    fig, ax = plt.subplots(figsize=(10, 5), dpi=100)
+    lines = [ax.plot([], [], lw=2, label=label, animated=True)[0] for label in feed.labels]
+    ax.set_xlim(hours_ago[0], 0)
+    ax.set_ylim(*ylim)
+    ax.set_xlabel("Hours ago")
+    ax.set_ylabel("MW")
+    ax.grid(alpha=0.3, ls="--")
+    ax.legend(loc="upper left")
+    clock = ax.text(0.99, 0.97, "", transform=ax.transAxes, ha="right", va="top", size=14, animated=True)
+    timing = ax.text(0.99, 0.02, "", transform=ax.transAxes, ha="right", size=8, color="0.5", animated=True)
+    artists = lines + [clock, timing]
+    last = [time.perf_counter(), 0.0]
+
+    def init():
+        for line in lines:
+            line.set_data([], [])
+        return artists
+
+    def update(_frame):
+        times, values = feed.poll()
+        if len(times):
+            buffer.push(values)
+        window_data = buffer.view()
+        x = hours_ago[capacity - len(window_data):]
+        for i, line in enumerate(lines):
+            line.set_data(x, window_data[:, i])
+        clock.set_text(str(feed.now()).replace("T", " ")[:16])
+        now = time.perf_counter()
+        # smoothed frame time so the number is readable
+        last[1] = 0.9 * last[1] + 0.1 * (now - last[0]) if last[1] else now - last[0]
+        last[0] = now
+        timing.set_text(f"{1e3 * last[1]:.1f} ms/frame")
+        return artists
+
+    ani = animation.FuncAnimation(
+        fig, update, frames=frames, init_func=init, blit=True, interval=1000 / fps,
+        cache_frame_data=False,
+    )
+    if fname:
+        ani.save(fname, fps=fps)
+    else:
+        plt.show()
+    return ani
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("source", choices=["caiso", "bpa"])
+    parser.add_argument("files", nargs="+")
+    parser.add_argument("--series", nargs="+", help="CAISO row prefixes or BPA columns")
+    parser.add_argument("--skiprows", type=int, default=23, help="header rows in the BPA file")
+    parser.add_argument("--speed", type=float, default=1800.0, help="grid seconds per wall second")
+    parser.add_argument("--window", type=float, default=24.0, help="hours shown")
+    parser.add_argument("--fps", type=float, default=20)
+    args = parser.parse_args()
+
+    kwargs = {"speed": args.speed}
+    if args.series:
+        kwargs["series"] = args.series
+    if args.source == "caiso":
+        feed = ReplayFeed.from_caiso(args.files, **kwargs)
+    else:
+        feed = ReplayFeed.from_bpa(args.files[0], skiprows=args.skiprows, **kwargs)
+    run(feed, window=args.window, fps=args.fps)
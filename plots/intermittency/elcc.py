@@ -0,0 +1,229 @@
+"""
+Capacity value of wind and solar: top-N-hour contribution and ELCC.
+
+Capacity factor says how much energy a source makes on average. Capacity
+value asks how much it helps when the grid needs it most:
+
+* top_hours(): the source's average output in the N highest-load hours, as
+  a fraction of its nameplate. Cheap and easy to explain.
+* elcc(): effective load carrying capability. The rest of the fleet is
+  modelled as identical units with a forced outage rate, sized (with a
+  perfect-capacity adjustment) so the load alone has ``target`` hours per
+  year of expected loss of load (LOLE). Adding the source lowers the LOLE;
+  its ELCC is the perfectly reliable capacity that would lower it just as
+  much. That's found by bisection over the added capacity.
+
+Everything runs on hourly means. The top hours come from np.argpartition,
+not a sort. LOLE for many candidate capacities is one interpolation into
+the fleet's outage table over an (candidates, hours) array, and the
+bisection runs for every penetration level at once. So ELCC per year, per
+season and per penetration over several years is well under a second.
+
+    python elcc.py --bpa ../../data/bpa-wind-low/WindGenTotalLoadYTD_201[789].xls --by year
+    python elcc.py --caiso data/CAISO-*.csv --by season
+
+Each group (year or season) gets its own fleet calibrated to the same LOLE
+rate, so the numbers are the source's value against that group's peaks.
+Between whole units the outage table is interpolated linearly.
+"""
+import argparse
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+from scipy.stats import binom
+
+UNIT_MW = 500.0
+FORCED_OUTAGE = 0.06
+TARGET_LOLE = 2.4  # hours/year, the usual "1 day in 10 years"
+HOURS_PER_YEAR = 8760
+PENETRATIONS = (0.5, 1, 2, 4)
+SEASONS = {"Winter": (12, 1, 2), "Spring": (3, 4, 5), "Summer": (6, 7, 8), "Fall": (9, 10, 11)}
+
+
+class Fleet(typing.NamedTuple):
+    """Conventional units: P(available < x) at x = 0, U, 2U, ... nU."""
+    capacity: np.ndarray  # MW levels
+    below: np.ndarray  # P(available capacity < level)
+    shift: float = 0.0  # perfect capacity added to calibrate, MW
+
+
+class CapacityValue(typing.NamedTuple):
+    group: str
+    hours: int
+    nameplate: float  # MW at penetration 1
+    capacity_factor: float
+    top_hours: float  # mean output in the top-N load hours / nameplate
+    penetrations: np.ndarray
+    elcc: np.ndarray  # MW at each penetration
+    elcc_fraction: np.ndarray  # elcc / (penetration * nameplate)
+
+
+def hourly(times, mw):
+    """Hourly means of 5-minute (or any sub-hourly) readings, NaN-aware."""
+    times = np.asarray(times, dtype="datetime64[s]")
+    mw = np.asarray(mw, dtype=float)
+    hours = times.astype("datetime64[h]")
+    starts = np.flatnonzero(np.r_[True, hours[1:] != hours[:-1]])
+    ok = ~np.isnan(mw)
+    total = np.add.reduceat(np.where(ok, mw, 0.0), starts, axis=0)
+    count = np.add.reduceat(ok.astype(int), starts, axis=0)
+    with np.errstate(invalid="ignore"):
+        return hours[starts], total / count
+
+
+def top_hours(load, gen, n=100, nameplate=None):
+    """Mean output during the ``n`` highest-load hours, per MW of nameplate."""
+    n = min(n, len(load))
+    top = np.argpartition(load, -n)[-n:]
+    nameplate = nameplate or np.max(gen)
+    return float(np.mean(gen[top]) / nameplate)
+
+
+def make_fleet(peak, unit_mw=UNIT_MW, forced_outage=FORCED_OUTAGE):
+    """Enough units to cover ``peak`` at their average availability."""
+    units = int(np.ceil(peak / (unit_mw * (1 - forced_outage)))) + 1
+    k = np.arange(units + 1)
+    # P(available < k*U) = P(fewer than k units up)
+    below = binom.cdf(k - 1, units, 1 - forced_outage)
+    return Fleet(k * unit_mw, below)
+
+
+def lole(net, fleet, added=0.0):
+    """
+    Expected hours with net load above available capacity.
+
+    ``net`` is (..., hours); ``added`` broadcasts against its leading axes,
+    so many candidate capacities are one call.
+    """
+    x = net - fleet.shift - np.asarray(added)[..., None]
+    return np.interp(x, fleet.capacity, fleet.below, left=0.0, right=1.0).sum(axis=-1)
+
+
+def bisect(f, lo, hi, goal, iters=40):
+    """Solve f(x) = goal for decreasing f, elementwise over arrays of brackets."""
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float) + np.zeros_like(lo)
+    for _ in range(iters):
+        mid = (lo + hi) / 2
+        above = f(mid) > goal
+        lo = np.where(above, mid, lo)
+        hi = np.where(above, hi, mid)
+    return (lo + hi) / 2
+
+
+def calibrate(load, fleet, target):
+    """Shift the fleet by perfect capacity so ``load`` alone has LOLE ``target``."""
+    peak = np.max(load)
+    shift = bisect(lambda s: lole(load, fleet, s), -peak, peak, target)
+    return fleet._replace(shift=float(shift))
+
+
+def elcc(load, gen, penetrations=PENETRATIONS, target=TARGET_LOLE, fleet=None):
+    """
+    ELCC (MW) of ``gen`` scaled to each penetration, against ``load``.
+
+    ``load`` and ``gen`` are hourly MW, same length, no NaN.
+    """
+    load = np.asarray(load, dtype=float)
+    gen = np.asarray(gen, dtype=float)
+    p = np.asarray(penetrations, dtype=float)
+    fleet = calibrate(load, fleet or make_fleet(load.max()), target * len(load) / HOURS_PER_YEAR)
+    with_gen = lole(load - p[:, None] * gen, fleet)  # (penetrations,)
+    return bisect(lambda x: lole(load, fleet, x), np.zeros_like(p), p * np.max(gen), with_gen)
+
+
+def groups(hours, by="year"):
+    """{label: boolean mask} over hourly timestamps."""
+    if by == "all":
+        return {"all": np.ones(len(hours), bool)}
+    years = hours.astype("datetime64[Y]").astype(int) + 1970
+    if by == "year":
+        return {str(y): years == y for y in np.unique(years)}
+    months = hours.astype("datetime64[M]").astype(int) % 12 + 1
+    if by == "season":
+        return {name: np.isin(months, m) for name, m in SEASONS.items()}
+    raise ValueError(f"Unknown grouping {by}")
+
+
+def study(times, load_mw, gen_mw, by="year", penetrations=PENETRATIONS, n=100, nameplate=None, target=TARGET_LOLE):
+    """CapacityValue for each group of a 5-minute or hourly load/generation pair."""
+    hours, load = hourly(times, load_mw)
+    _hours, gen = hourly(times, gen_mw)
+    ok = ~(np.isnan(load) | np.isnan(gen))
+    hours, load, gen = hours[ok], load[ok], gen[ok]
+    nameplate = nameplate or float(np.max(gen))
+    results = []
+    for label, mask in groups(hours, by).items():
+        if not mask.any():
+            continue
+        L, G = load[mask], gen[mask]
+        mw = elcc(L, G, penetrations, target)
+        results.append(CapacityValue(
+            label,
+            int(mask.sum()),
+            nameplate,
+            float(G.mean() / nameplate),
+            top_hours(L, G, n, nameplate),
+            np.asarray(penetrations, dtype=float),
+            mw,
+            mw / (np.asarray(penetrations) * nameplate),
+        ))
+    return results
+
+
+def plot(results, source="Wind", fname=None, n=100):
+    fig, ax = plt.subplots(figsize=(10, 5), dpi=150)
+    width = 0.8 / (len(results[0].penetrations) + 2)
+    index = np.arange(len(results))
+    ax.bar(index - width, [100 * r.capacity_factor for r in results], width, color="0.6", edgecolor="k", label="Capacity factor")
+    ax.bar(index, [100 * r.top_hours for r in results], width, color="tan", edgecolor="k", label=f"Output in top {n} load hours")
+    cmap = plt.get_cmap("Greens")
+    for j, p in enumerate(results[0].penetrations):
+        ax.bar(
+            index + (j + 1) * width, [100 * r.elcc_fraction[j] for r in results], width,
+            color=cmap(0.4 + 0.6 * j / len(results[0].penetrations)), edgecolor="k", label=f"ELCC at {p:g}x today",
+        )
+    ax.set_xticks(index + width * (len(results[0].penetrations) - 1) / 2)
+    ax.set_xticklabels([r.group for r in results])
+    ax.set_ylabel("% of nameplate")
+    ax.set_title(f"Capacity value of {source}")
+    ax.grid(alpha=0.3, ls="--", axis="y")
+    ax.legend(fontsize="small")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bpa", nargs="*", default=[], help="BPA spreadsheets: Wind against Load")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--caiso", nargs="*", default=[], help="CAISO day files: Solar against Demand")
+    parser.add_argument("--by", choices=["year", "season", "all"], default="year")
+    parser.add_argument("--top", type=int, default=100)
+    parser.add_argument("--fname", default=None)
+    args = parser.parse_args()
+
+    if args.bpa:
+        from bpa import load_clean
+
+        frames = [load_clean(f, args.skiprows)[0] for f in args.bpa]
+        times = np.concatenate([f.index.values for f in frames])
+        load, gen = (np.concatenate([f[c].values for f in frames]) for c in ("Load", "Wind"))
+        source = "BPA wind"
+    else:
+        from resample import from_caiso
+
+        solar = from_caiso(args.caiso, "Solar")
+        demand = from_caiso(args.caiso, "Demand (5")
+        common, si, di = np.intersect1d(solar.times, demand.times, return_indices=True)
+        times, load, gen = common, demand.mw[di], solar.mw[si]
+        source = "CAISO solar"
+    results = study(times, load, gen, args.by, n=args.top)
+    for r in results:
+        print(f"{r.group:8} CF {100 * r.capacity_factor:5.1f}%  top-{args.top} {100 * r.top_hours:5.1f}%  ELCC "
+              + "  ".join(f"{p:g}x {100 * f:5.1f}%" for p, f in zip(r.penetrations, r.elcc_fraction)))
+    plot(results, source, args.fname, args.top)
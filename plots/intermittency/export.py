@@ -0,0 +1,233 @@
+"""
+Export the data behind the grid figures for drawing in the browser.
+
+A year of BPA wind at 5 minutes is ~100k numbers, a few hundred kB as 16-bit
+integers, versus a 7200x4800 PNG. Each series is quantized to ``precision``
+(e.g. 1 MW), optionally decimated, and written as either
+
+* ``json``: {"start": q0, "deltas": [...]} integer deltas, which gzip very
+  well on the wire, or
+* ``bin``: the quantized values as little-endian int8/16/32 (whichever fits),
+  ready for a JS typed array.
+
+Evenly spaced x values are stored as just start and step. Anything else
+(decimated or gappy data) gets its own delta-encoded x. ``manifest.json`` says
+where everything is and how to turn integers back into numbers:
+value = offset + scale * q. Missing values are listed by index.
+
+    python export.py --bpa ../../data/bpa-wind-low/WindGenTotalLoadYTD_2017.xls --skiprows 21
+    python export.py --format bin --points 2000
+"""
+import argparse
+import json
+import os
+
+import numpy as np
+
+DTYPES = [np.int8, np.int16, np.int32, np.int64]
+
+
+def decimate(x, y, points):
+    """
+    Min/max decimation to about ``points`` points.
+
+    Keeps the lowest and highest value of each bucket, in order, so peaks
+    and calm spells survive (plain striding would skip over them).
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    if points is None or len(y) <= points:
+        return x, y
+    buckets = max(points // 2, 1)
+    edges = np.linspace(0, len(y), buckets + 1).astype(int)
+    starts = edges[:-1]
+    # NaNs never win either contest
+    filled_lo = np.where(np.isnan(y), np.inf, y)
+    filled_hi = np.where(np.isnan(y), -np.inf, y)
+    idx = []
+    for lo, hi in zip(starts, edges[1:]):
+        if hi > lo:
+            idx.extend(sorted({lo + int(np.argmin(filled_lo[lo:hi])), lo + int(np.argmax(filled_hi[lo:hi]))}))
+    idx = np.array(idx)
+    return x[idx], y[idx]
+
+
+def _quantize(values, precision):
+    """Integers q with values ~= offset + precision*q, and the missing indices."""
+    values = np.asarray(values, dtype=float)
+    missing = np.flatnonzero(np.isnan(values))
+    offset = float(np.nanmin(values)) if len(missing) < len(values) else 0.0
+    offset = np.floor(offset / precision) * precision
+    q = np.round((np.nan_to_num(values, nan=offset) - offset) / precision).astype(np.int64)
+    return q, offset, missing
+
+
+def _smallest(q):
+    lo, hi = (int(q.min()), int(q.max())) if len(q) else (0, 0)
+    for dtype in DTYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return dtype
+    return np.int64
+
+
+def _axis(x, precision):
+    """Encode an x axis, as start/step if it's evenly spaced."""
+    x = np.asarray(x, dtype=float)
+    if not len(x):
+        return {"start": 0.0, "step": 0.0, "count": 0}
+    if len(x) > 2:
+        step = (x[-1] - x[0]) / (len(x) - 1)
+        if np.allclose(np.diff(x), step, rtol=0, atol=precision / 2):
+            return {"start": float(x[0]), "step": float(step), "count": len(x)}
+    q, offset, _missing = _quantize(x, precision)
+    return {"offset": offset, "scale": precision, "start": int(q[0]), "deltas": np.diff(q).tolist()}
+
+
+def encode(x, y, precision=1.0, x_precision=1.0, fmt="json"):
+    """
+    Encode one series.
+
+    Returns (metadata dict, payload bytes). The payload always goes in its
+    own file so the manifest stays small.
+    """
+    q, offset, missing = _quantize(y, precision)
+    meta = {
+        "count": len(q),
+        "x": _axis(x, x_precision),
+        "offset": offset,
+        "scale": precision,
+        "missing": missing.tolist(),
+        "encoding": fmt,
+    }
+    if fmt == "json":
+        body = {"start": int(q[0]) if len(q) else 0, "deltas": np.diff(q).tolist()}
+        payload = json.dumps(body, separators=(",", ":")).encode()
+    elif fmt == "bin":
+        dtype = _smallest(q)
+        meta["dtype"] = np.dtype(dtype).name
+        payload = q.astype(np.dtype(dtype).newbyteorder("<")).tobytes()
+    else:
+        raise ValueError(f"Unknown format {fmt}")
+    return meta, payload
+
+
+def decode(meta, payload):
+    """Inverse of encode(), for checking. Returns (x, y)."""
+    n = meta["count"]
+    if meta["encoding"] == "json":
+        body = json.loads(payload)
+        q = np.concatenate(([body["start"]], body["deltas"])).cumsum()[:n]
+    else:
+        q = np.frombuffer(payload, dtype=np.dtype(meta["dtype"]).newbyteorder("<")).astype(np.int64)
+    y = meta["offset"] + meta["scale"] * q.astype(float)
+    y[meta["missing"]] = np.nan
+    ax = meta["x"]
+    if "step" in ax:
+        x = ax["start"] + ax["step"] * np.arange(n)
+    else:
+        x = ax["offset"] + ax["scale"] * np.concatenate(([ax["start"]], ax["deltas"])).cumsum()
+    return x, y
+
+
+def caiso_scenes(data, seasons=("Summer", "Winter")):
+    """The series behind the solar-vs-nuclear-cali scenes, from process()."""
+    from caiso import process
+
+    figures = {}
+    for season in seasons:
+        for nonelectric in (False, True):
+            series = []
+            for d in process(data, season, nonelectric):
+                series.append({
+                    "label": d.label,
+                    "x": d.time,
+                    "y": d.vals,
+                    "integral": float(d.integral),
+                    "color": d.color,
+                    "opacity": d.opacity,
+                })
+            name = f"solar-scene-{season.lower()}" + ("-all-energy" if nonelectric else "")
+            figures[name] = {
+                "title": f"{season} {'total energy' if nonelectric else 'electricity'} in California",
+                "x units": "hour of day",
+                "y units": "GW",
+                "precision": 0.01,
+                "x precision": 1 / 120,
+                "series": series,
+            }
+    return figures
+
+
+def bpa_wind(data, start="2017-01-01", end="2017-12-25", year="2017"):
+    """The series behind plot_capacity in data/bpa-wind-low."""
+    df = data[start:end]
+    y = df["Wind"].values.astype(float)
+    x = df.index.values.astype("datetime64[s]").astype(np.int64)
+    capacity = float(np.nanmax(y))
+    return {
+        f"wind-generation-{year}": {
+            "title": f"Electricity Generation by Wind in the Bonnevile Power Administration Control Area ({year})",
+            "x units": "seconds since 1970-01-01, Pacific local time",
+            "y units": "MW",
+            "precision": 1.0,
+            "x precision": 1.0,
+            "capacity": capacity,
+            # missing readings are skipped, not counted as zero output
+            "capacity factor": float(np.nanmean(y) / capacity),
+            "series": [{"label": "Wind", "x": x, "y": y, "color": "green"}],
+        }
+    }
+
+
+def export(figures, out="payloads", fmt="json", points=None):
+    """
+    Write every figure's series plus ``manifest.json`` into ``out``.
+
+    Returns the manifest.
+    """
+    os.makedirs(out, exist_ok=True)
+    manifest = {"format": 1, "figures": {}}
+    for name, figure in figures.items():
+        entry = {k: v for k, v in figure.items() if k not in ("series", "precision", "x precision")}
+        entry["series"] = []
+        for i, s in enumerate(figure["series"]):
+            x, y = decimate(s["x"], s["y"], points)
+            meta, payload = encode(x, y, figure["precision"], figure["x precision"], fmt)
+            fname = f"{name}-{i}.{fmt}"
+            with open(os.path.join(out, fname), "wb") as f:
+                f.write(payload)
+            meta.update({k: v for k, v in s.items() if k not in ("x", "y")})
+            meta["file"] = fname
+            meta["bytes"] = len(payload)
+            entry["series"].append(meta)
+        manifest["figures"][name] = entry
+    with open(os.path.join(out, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=1)
+    return manifest
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--out", default="payloads")
+    parser.add_argument("--format", choices=["json", "bin"], default="json")
+    parser.add_argument("--points", type=int, default=None, help="decimate each series to about this many")
+    parser.add_argument("--caiso-dir", default="data")
+    parser.add_argument("--bpa", help="BPA WindGenTotalLoadYTD spreadsheet")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--year", default="2017")
+    args = parser.parse_args()
+
+    figures = {}
+    if os.path.isdir(args.caiso_dir):
+        from caiso import read_data
+
+        figures.update(caiso_scenes(read_data(args.caiso_dir)))
+    if args.bpa:
+        from bpa import load
+
+        year = args.year
+        figures.update(bpa_wind(load(args.bpa, args.skiprows), f"{year}-01-01", f"{year}-12-25", year))
+    manifest = export(figures, args.out, args.format, args.points)
+    for name, entry in manifest["figures"].items():
+        print(f"{name}: {sum(s['bytes'] for s in entry['series'])} bytes in {len(entry['series'])} series")
@@ -0,0 +1,191 @@
+"""
+How much fuel it takes to meet a demand curve.
+
+The energy density table in energy-sources.yaml says a kg of uranium holds
+8e7 MJ and a kg of coal 30. This turns any demand series (CAISO days, a BPA
+year, or just an average load) into kg, cubic meters, trucks and railcars
+of each fuel per hour, day or year:
+
+    flow = fuel_flow(times, mw, period="D")
+    flow.mass[:, flow.fuels.index("coal")]        # kg of coal each day
+    flow.vehicles["railcar"]                      # (days, fuels)
+
+Fuel needed is linear in energy, so the demand is summed into periods first
+(one reduceat) and then multiplied out against every fuel at once; years of
+5-minute data cost about the same as one day.
+
+``efficiency`` is heat to electricity at the plant. ``utilization`` is the
+fraction of the table's energy that actually comes out of the fuel as
+loaded: 1 for things that burn completely, and for "uranium (LWR)" about 5%,
+since a light water reactor fissions only that much of the heavy metal in
+its fuel before it's discharged (45 GWd/t against the table's 933 GWd/t).
+
+    python fuel.py --average-gw 25 --years 1
+    python fuel.py --bpa ../../data/bpa-wind-low/WindGenTotalLoadYTD_2017.xls --skiprows 21
+"""
+import argparse
+import os
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+import yaml
+
+from resample import native_step
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SOURCES_YAML = os.path.join(HERE, "..", "..", "data", "energy-sources.yaml")
+MJ_PER_MWH = 3600.0
+
+# name: (row in the energy density table, efficiency, density kg/m^3, utilization)
+PROPERTIES = {
+    "uranium": ("uranium", 0.33, 19050, 1.0),
+    "uranium (LWR)": ("uranium", 0.33, 19050, 45 / 933.1),
+    "thorium": ("thorium", 0.33, 11700, 1.0),
+    "methane": ("methane", 0.50, 422, 1.0),  # as LNG, in a combined cycle plant
+    "diesel": ("diesel", 0.35, 832, 1.0),
+    "lpg": ("lpg", 0.35, 540, 1.0),
+    "gasoline": ("gasoline", 0.30, 745, 1.0),
+    "coal": ("coal", 0.33, 833, 1.0),  # bulk
+    "wood": ("wood", 0.25, 500, 1.0),  # chips, bulk
+}
+# name: (payload kg, capacity m^3); whichever runs out first sets the count
+VEHICLES = {
+    "truck": (25000, 34),
+    "railcar": (100000, 110),
+}
+
+
+class Fuel(typing.NamedTuple):
+    name: str
+    energy_density: float  # MJ/kg
+    efficiency: float  # electric out / heat in
+    density: float  # kg/m^3
+    utilization: float = 1.0
+
+    @property
+    def kg_per_mwh(self):
+        """kg of fuel per MWh of electricity."""
+        return MJ_PER_MWH / (self.energy_density * self.efficiency * self.utilization)
+
+
+class FuelFlow(typing.NamedTuple):
+    periods: np.ndarray  # datetime64, start of each period
+    fuels: list
+    energy: np.ndarray  # (periods,) MWh of electricity
+    mass: np.ndarray  # (periods, fuels) kg
+    volume: np.ndarray  # (periods, fuels) m^3
+    vehicles: dict  # name -> (periods, fuels) loads
+
+
+def load_fuels(fname=SOURCES_YAML, properties=PROPERTIES):
+    with open(fname) as f:
+        table = yaml.safe_load(f)["energy density"]["val"]
+    return [
+        Fuel(name, float(table[row]), efficiency, density, utilization)
+        for name, (row, efficiency, density, utilization) in properties.items()
+    ]
+
+
+def _step_hours(times):
+    """
+    Hours each reading covers: the gap to the next one, but never more than
+    the native step (a gap in the data is missing readings, not a long one).
+    The last reading gets a full step.
+    """
+    times = np.asarray(times, dtype="datetime64[s]").astype(np.int64)
+    if len(times) < 2:
+        return np.ones(len(times))
+    step = native_step(times.astype("datetime64[s]")).astype(np.int64)
+    return np.minimum(np.diff(times, append=times[-1] + step), step) / 3600
+
+
+def fuel_flow(times, mw, fuels=None, period="D"):
+    """
+    Fuel needed each ``period`` ("h", "D", "M" or "Y") to make ``mw``.
+
+    ``times`` is when each reading starts; each is taken to last until the
+    next. Missing readings count as no demand.
+    """
+    fuels = fuels or load_fuels()
+    times = np.asarray(times, dtype="datetime64[s]")
+    order = np.argsort(times, kind="stable")
+    times = times[order]
+    mwh = np.nan_to_num(np.asarray(mw, dtype=float)[order]) * _step_hours(times)
+
+    bins = times.astype(f"datetime64[{period}]")
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    energy = np.add.reduceat(mwh, starts)
+
+    kg_per_mwh = np.array([f.kg_per_mwh for f in fuels])
+    density = np.array([f.density for f in fuels])
+    mass = energy[:, None] * kg_per_mwh
+    volume = mass / density
+    vehicles = {
+        name: np.maximum(mass / payload, volume / capacity)
+        for name, (payload, capacity) in VEHICLES.items()
+    }
+    return FuelFlow(bins[starts], [f.name for f in fuels], energy, mass, volume, vehicles)
+
+
+def flat_demand(average_gw, start="2019-01-01", years=1, step=5):
+    """A constant load, for national totals or "average California"."""
+    start = np.datetime64(start, "m")
+    end = (start.astype("datetime64[Y]") + years).astype("datetime64[m]")
+    times = np.arange(start, end, np.timedelta64(step, "m"))
+    return times, np.full(len(times), average_gw * 1000.0)
+
+
+def plot(flow, title, fname=None):
+    """Tonnes and railcars of each fuel per period, log scale."""
+    per_period = flow.mass.mean(axis=0) / 1000
+    cars = flow.vehicles["railcar"].mean(axis=0)
+    order = np.argsort(per_period)[::-1]
+    labels = [flow.fuels[i][0].upper() + flow.fuels[i][1:] for i in order]
+    unit = {"h": "hour", "D": "day", "M": "month", "Y": "year"}[np.datetime_data(flow.periods.dtype)[0]]
+
+    fig, ax = plt.subplots(figsize=(10, 5), dpi=150)
+    bars = ax.bar(labels, per_period[order], color="gray", edgecolor="k")
+    for bar, n in zip(bars, cars[order]):
+        ax.text(
+            bar.get_x() + bar.get_width() / 2, bar.get_height() * 1.3,
+            f"{n:,.0f} railcars" if n >= 1 else f"1 railcar every {1 / n:,.0f} {unit}s",
+            ha="center", va="bottom", fontsize="x-small", rotation=90,
+        )
+    ax.set_yscale("log")
+    ax.set_ylim(top=ax.get_ylim()[1] * 1e3)
+    ax.set_ylabel(f"Fuel per {unit} (tonnes)")
+    ax.set_title(title)
+    ax.grid(alpha=0.3, ls="--", axis="y")
+    plt.xticks(rotation=30, ha="right")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--average-gw", type=float, default=25.0, help="flat demand, e.g. about CAISO's average")
+    parser.add_argument("--years", type=int, default=1)
+    parser.add_argument("--bpa", help="use the Load column of a BPA WindGenTotalLoadYTD spreadsheet")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--period", default="D", choices=["h", "D", "M", "Y"])
+    parser.add_argument("--fname", default=None)
+    args = parser.parse_args()
+
+    if args.bpa:
+        from bpa import load
+
+        data = load(args.bpa, args.skiprows)
+        times, mw = data.index.values, data["Load"].values
+        title = "Fuel to supply the BPA load"
+    else:
+        times, mw = flat_demand(args.average_gw, years=args.years)
+        title = f"Fuel to supply {args.average_gw:g} GW of electricity"
+    flow = fuel_flow(times, mw, period=args.period)
+    for i, name in enumerate(flow.fuels):
+        print(f"{name:14} {flow.mass[:, i].sum() / 1000:14,.1f} t {flow.volume[:, i].sum():14,.1f} m3"
+              f" {flow.vehicles['truck'][:, i].sum():12,.1f} trucks {flow.vehicles['railcar'][:, i].sum():12,.1f} railcars")
+    plot(flow, title, args.fname)
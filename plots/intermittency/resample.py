@@ -0,0 +1,298 @@
+"""
+Put grid series from different places on one UTC time grid.
+
+CAISO day files and BPA spreadsheets are both 5-minute MW readings in Pacific
+local time, but arrive in different shapes. Here every series becomes a
+Series (UTC timestamps plus MW), and join() lays any number of them onto a
+common grid at whatever step you ask for:
+
+    wind = from_bpa(load(fname, 23), ["Wind", "Load"])
+    solar = from_caiso(fnames, "Solar")
+    frame = join(wind + solar, "1h")
+    frame["BPA Wind"] + frame["CAISO Solar"]   # MW, hourly, UTC
+
+Each reading is taken as the average power over the step that starts at its
+timestamp. Resampling integrates that piecewise-constant power and splits
+the energy across the new bins by overlap, so MWh are conserved going up or
+down in resolution and across bins that only partly overlap. Missing
+readings and gaps between files count as no coverage rather than zero
+power: a bin's MW is its energy over the time actually covered, and bins
+covered less than ``min_coverage`` are NaN.
+
+Everything is np.interp on cumulative sums (no row-by-row merging), so a
+year of 5-minute data for a dozen series joins in a fraction of a second.
+"""
+import argparse
+import os
+import typing
+import zoneinfo
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+TZ = "America/Los_Angeles"
+UNITS = {"s": "s", "min": "m", "m": "m", "h": "h", "D": "D", "d": "D"}
+
+
+class Series(typing.NamedTuple):
+    times: np.ndarray  # datetime64[s], UTC, start of each reading's interval
+    mw: np.ndarray
+    region: str
+    name: str
+
+    @property
+    def label(self):
+        return f"{self.region} {self.name}"
+
+
+class Frame(typing.NamedTuple):
+    """Series joined onto a common grid: ``values[:, i]`` is ``labels[i]``."""
+    times: np.ndarray  # datetime64[s], UTC, start of each bin
+    step: np.timedelta64
+    values: np.ndarray  # average MW, NaN where under-covered
+    coverage: np.ndarray  # fraction of each bin with data
+    labels: list
+
+    def __getitem__(self, label):
+        if isinstance(label, str):
+            return self.values[:, self.labels.index(label)]
+        return tuple.__getitem__(self, label)
+
+    def energy(self):
+        """
+        MWh in each bin, extrapolated: the average MW over the part of the
+        bin with data times the whole bin, so a gap counts as more of the
+        same, not as zero (multiply by ``coverage`` for just what was
+        recorded). NaN where under-covered.
+        """
+        return self.values * (self.step / np.timedelta64(1, "h"))
+
+
+def parse_step(step):
+    """'5min', '1h', '1D', a number of seconds or a timedelta64 -> timedelta64[s]."""
+    if isinstance(step, str):
+        number = step.rstrip("".join(UNITS))
+        unit = step[len(number):]
+        step = np.timedelta64(int(number or 1), UNITS[unit])
+    elif not isinstance(step, np.timedelta64):
+        step = np.timedelta64(int(step), "s")
+    return step.astype("timedelta64[s]")
+
+
+def to_utc(local, tz=TZ):
+    """
+    Local wall-clock times (naive) to UTC datetime64[s].
+
+    ``tz`` is a zone name, or a fixed offset in hours. Daylight saving is
+    looked up once per distinct hour rather than per reading. In the repeated
+    hour when clocks go back, the second time a timestamp shows up is taken
+    to be the later (standard time) one.
+    """
+    local = np.asarray(local, dtype="datetime64[s]")
+    offsets = utc_offsets(local, tz)
+    return local - offsets[repeats(local).astype(int), np.arange(len(local))]
+
+
+def utc_offsets(local, tz=TZ):
+    """
+    (2, n) UTC offsets of local times, for fold=0 and fold=1.
+
+    The two rows differ only in the repeated hour when clocks go back.
+    """
+    local = np.asarray(local, dtype="datetime64[s]")
+    if not isinstance(tz, str):
+        return np.full((2, len(local)), np.timedelta64(int(round(tz * 3600)), "s"))
+    zone = zoneinfo.ZoneInfo(tz)
+    hours, inverse = np.unique(local.astype("datetime64[h]"), return_inverse=True)
+    offsets = np.empty((2, len(hours)), dtype="timedelta64[s]")
+    for i, hour in enumerate(hours.astype(datetime)):
+        for fold in (0, 1):
+            offset = hour.replace(tzinfo=zone, fold=fold).utcoffset()
+            offsets[fold, i] = np.timedelta64(int(offset / timedelta(seconds=1)), "s")
+    return offsets[:, inverse.ravel()]
+
+
+def repeats(times):
+    """True where a timestamp already appeared earlier in ``times``."""
+    _unique, first, which = np.unique(times, return_index=True, return_inverse=True)
+    return np.arange(len(times)) != first[which.ravel()]
+
+
+def to_local(utc, tz=TZ):
+    """UTC datetime64 back to local wall-clock time (naive datetime64[s])."""
+    utc = np.asarray(utc, dtype="datetime64[s]")
+    if not isinstance(tz, str):
+        return utc + np.timedelta64(int(round(tz * 3600)), "s")
+    zone = zoneinfo.ZoneInfo(tz)
+    hours, inverse = np.unique(utc.astype("datetime64[h]"), return_inverse=True)
+    offsets = np.array([
+        int(hour.replace(tzinfo=timezone.utc).astimezone(zone).utcoffset() / timedelta(seconds=1))
+        for hour in hours.astype(datetime)
+    ], dtype="timedelta64[s]")
+    return utc + offsets[inverse.ravel()]
+
+
+def native_step(times):
+    """The usual spacing of a series (the most common difference)."""
+    diffs = np.diff(np.asarray(times, dtype="datetime64[s]")).astype(np.int64)
+    diffs = diffs[diffs > 0]
+    if not len(diffs):
+        raise ValueError("Need at least two distinct times to tell the step")
+    values, counts = np.unique(diffs, return_counts=True)
+    return np.timedelta64(int(values[np.argmax(counts)]), "s")
+
+
+def _cumulative(series, step=None):
+    """
+    Breakpoints (seconds) and cumulative MW*s and covered seconds there.
+
+    Reading i covers [t_i, t_i + d_i) with d_i the native step, cut short if
+    the next reading comes sooner. NaN readings cover nothing.
+    """
+    order = np.argsort(series.times, kind="stable")
+    t = series.times[order].astype(np.int64)
+    mw = np.asarray(series.mw, dtype=float)[order]
+    step = (step or native_step(series.times)).astype(np.int64)
+    dur = np.minimum(np.diff(t, append=t[-1] + step), step).astype(float)
+    ok = ~np.isnan(mw)
+    dur = np.where(ok, dur, 0.0)
+    energy = np.where(ok, mw, 0.0) * dur
+    # interleave start and end of each reading: x = s0, e0, s1, e1, ...
+    x = np.empty(2 * len(t))
+    x[0::2] = t
+    x[1::2] = t + dur
+    cum_e = np.concatenate(([0.0], np.cumsum(energy)))
+    cum_c = np.concatenate(([0.0], np.cumsum(dur)))
+    e = np.empty_like(x)
+    c = np.empty_like(x)
+    e[0::2], e[1::2] = cum_e[:-1], cum_e[1:]
+    c[0::2], c[1::2] = cum_c[:-1], cum_c[1:]
+    return x, e, c
+
+
+def resample(series, edges, step=None):
+    """
+    Energy (MW*s) and covered seconds of ``series`` in each bin of ``edges``.
+
+    ``edges`` are datetime64 bin boundaries, one more than the bins.
+    """
+    x, e, c = _cumulative(series, step)
+    at = np.asarray(edges, dtype="datetime64[s]").astype(np.int64).astype(float)
+    # np.interp holds the ends flat, which is right: no data, no energy
+    return np.diff(np.interp(at, x, e)), np.diff(np.interp(at, x, c))
+
+
+def grid(start, end, step):
+    """Bin starts from ``start`` (floored to the step) up to ``end``."""
+    step = parse_step(step)
+    start = np.datetime64(start, "s")
+    end = np.datetime64(end, "s")
+    s = step.astype(np.int64)
+    first = (start.astype(np.int64) // s * s).astype("datetime64[s]")
+    return np.arange(first, end, step)
+
+
+def join(series, step="1h", start=None, end=None, min_coverage=0.5):
+    """
+    Join many Series onto one UTC grid of average MW.
+
+    ``start``/``end`` default to the span of all the series.
+    """
+    series = list(series)
+    step = parse_step(step)
+    if start is None:
+        start = min(s.times.min() for s in series)
+    if end is None:
+        end = max(s.times.max() + native_step(s.times) for s in series)
+    times = grid(start, end, step)
+    edges = np.append(times, times[-1] + step)
+    seconds = float(step.astype(np.int64))
+    values = np.empty((len(times), len(series)))
+    coverage = np.empty_like(values)
+    for i, s in enumerate(series):
+        energy, covered = resample(s, edges)
+        coverage[:, i] = covered / seconds
+        with np.errstate(invalid="ignore", divide="ignore"):
+            values[:, i] = np.where(coverage[:, i] >= min_coverage, energy / covered, np.nan)
+    return Frame(times, step, values, coverage, [s.label for s in series])
+
+
+def from_caiso(fnames, prefix, region="CAISO", name=None, tz=TZ):
+    """One Series from a row (e.g. "Solar", "Demand (5") of many CAISO day files."""
+    from caiso import read_day
+
+    times, mw = [], []
+    for fname in sorted(fnames):
+        day = read_day(os.path.basename(fname), prefix, data_dir=os.path.dirname(fname) or ".")
+        if day is not None:
+            times.append(np.array(day[0], dtype="datetime64[s]"))
+            mw.append(day[1])
+    if not times:
+        raise ValueError(f"No '{prefix}' rows in {fnames}")
+    name = name or prefix.split(" (")[0]
+    return Series(to_utc(np.concatenate(times), tz), np.concatenate(mw), region, name)
+
+
+def from_bpa(data, columns=("Load", "Wind", "Hydro", "Nuclear", "Fossil/Biomass"), region="BPA", tz=TZ):
+    """Series for the columns of a bpa.load() frame."""
+    times = to_utc(data.index.values, tz)
+    return [
+        Series(times, data[c].values.astype(float), region, c)
+        for c in columns if c in data.columns
+    ]
+
+
+def plot(frame, supply, demand, fname=None):
+    """Combined supply against combined demand on the joined grid."""
+    fig, ax = plt.subplots(figsize=(12, 5), dpi=150)
+    t = frame.times.astype(datetime)
+    total = np.zeros(len(frame.times))
+    for label in supply:
+        new = total + np.nan_to_num(frame[label])
+        ax.fill_between(t, total, new, step="post", alpha=0.6, label=label)
+        total = new
+    ax.step(t, sum(frame[d] for d in demand), where="post", color="k", lw=1, label=" + ".join(demand))
+    ax.set_ylabel("Average power (MW)")
+    ax.set_xlabel(f"UTC, {frame.step.astype(object)} bins")
+    ax.set_title("Combined West Coast supply vs. demand")
+    ax.grid(alpha=0.3, ls="--")
+    ax.legend(loc="upper left")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--bpa", nargs="*", default=[], help="BPA WindGenTotalLoadYTD spreadsheets")
+    parser.add_argument("--skiprows", type=int, default=23)
+    parser.add_argument("--caiso", nargs="*", default=[], help="CAISO day files")
+    parser.add_argument("--step", default="1h")
+    parser.add_argument("--fname", default=None)
+    args = parser.parse_args()
+
+    series = []
+    if args.bpa:
+        from bpa import load
+
+        for fname in args.bpa:
+            series.extend(from_bpa(load(fname, args.skiprows), ["Load", "Wind"]))
+    for prefix in ("Solar", "Wind", "Demand (5"):
+        try:
+            series.append(from_caiso(args.caiso, prefix))
+        except ValueError:
+            pass
+    # one BPA Series per spreadsheet: stitch years together by label
+    merged = {}
+    for s in series:
+        if s.label in merged:
+            m = merged[s.label]
+            s = Series(np.concatenate((m.times, s.times)), np.concatenate((m.mw, s.mw)), s.region, s.name)
+        merged[s.label] = s
+    frame = join(merged.values(), args.step)
+    supply = [lbl for lbl in frame.labels if lbl.endswith(("Wind", "Solar"))]
+    demand = [lbl for lbl in frame.labels if lbl.endswith(("Load", "Demand"))]
+    plot(frame, supply, demand, args.fname)
@@ -10,116 +10,18 @@ So, 2x2 subplots? With text in each one saying how much power going around.
 Both nuclear and solar will just use some form of energy storage to deal with
 intermittency and/or load follow
 """
-import os
-import csv
-from datetime import datetime
 import copy
 
 import numpy as np
 import matplotlib.pyplot as plt
 
 import matplotlib
-matplotlib.use('TkAgg') 
 from matplotlib import animation
 from matplotlib.animation import ArtistAnimation
 from matplotlib.animation import ImageMagickFileWriter
 from matplotlib import collections
 
-DFMT = "%m/%d/%Y %H:%M"
-NUM_POINTS = 288  # b/c the data is messy
-
-
-def read_data():
-    """
-    Read CAISO data
-
-    Exported from web interface at https://www.caiso.com/TodaysOutlook/Pages/supply.html
-
-    We need:
-    * Summer demand
-    * Winter demand
-    * Summer solar (mostly shape important)
-    * Winter solar (shape and peak/avg important for setting mag)
-    * Nuclear generation (assume 91% cf)
-    """
-    data = {}
-    data.update(_read_demand())
-    data.update(_read_solar_supply())
-    data.update(_read_nuclear_supply())
-    return data
-
-
-def _read_demand():
-    """Read summer and winter demand curves."""
-    data = {}
-    for label, fname in [
-        # ("Summer demand", "CAISO-demand-20200621.csv"),
-        ("Summer demand", "CAISO-demand-20190621.csv"),
-        ("Winter demand", "CAISO-demand-20191221.csv"),
-    ]:
-        datetimes = []
-        print(f"opening {fname}")
-        with open(os.path.join("data", fname)) as f:
-            reader = csv.reader(f)
-            row = next(reader)  # grab header
-            # process row full of times
-            date = row[0].split()[1]
-            times = row[1:NUM_POINTS]
-            # convert to datetime objects
-            # import pdb;pdb.set_trace()
-            datetimes = [datetime.strptime(f"{date} {time}", DFMT) for time in times]
-
-            for row in reader:
-                if row[0].startswith("Demand (5"):
-                    # process demand data
-                    print(f"Reading {label}")
-                    mw = np.array([float(di) for di in row[1:NUM_POINTS]])
-                    data[label] = datetimes, mw
-                else:
-                    # lookahead estimate. throw it away
-                    print(f"Skipping {row[0]}")
-                    continue
-    return data
-
-
-def _read_solar_supply():
-    """Read how much solar comes in a day."""
-    data = {}
-    for label, fname in [
-        ("Summer solar", "CAISO-renewables-20190621.csv"),
-        ("Winter solar", "CAISO-renewables-20191221.csv"),
-    ]:
-        datetimes = []
-        print(f"opening {fname}")
-        with open(os.path.join("data", fname)) as f:
-            reader = csv.reader(f)
-            row = next(reader)  # grab header
-            # process row full of times
-            date = row[0].split()[1]
-            times = row[1:NUM_POINTS]
-            datetimes = [datetime.strptime(f"{date} {time}", DFMT) for time in times]
-
-            for row in reader:
-                if row[0].startswith("Solar"):
-                    # process demand data
-                    print(f"Reading {label}")
-                    mw = np.array([float(di) for di in row[1:NUM_POINTS]])
-                    data[label] = datetimes, mw
-                else:
-                    # lookahead estimate. throw it away
-                    print(f"Skipping {row[0]}")
-                    continue
-    return data
-
-
-def _read_nuclear_supply():
-    return {}
-
-
-def _integrate_megawatts(mw):
-    """Sum megawatts over a day and return GW*day. Assume 5 minute increments."""
-    mw = np.array(mw)
-    return sum(mw * 5 / 60 / 24) / 1000
+from caiso import read_data, Data, process, _integrate_megawatts
 
 
 def plot_demand(data):
@@ -220,65 +122,6 @@ def plot_solar_scenario(data):
     plt.savefig("solar-scenario.png")
 
 
-import typing
-
-
-class Data(typing.NamedTuple):
-    time: np.ndarray
-    vals: np.ndarray
-    integral: np.ndarray
-    label: str
-    color: str
-    hatch: str = None
-    opacity: float = 1.0
-
-
-def process(data, season, nonelectric=False):
-    demand_dt, demand_mw = data[f"{season} demand"]
-    demand_integral = _integrate_megawatts(demand_mw)
-    demand_gw = demand_mw/1000
-    demand_t = np.array([dt.time().hour + dt.time().minute / 60 for dt in demand_dt])
-    demand = Data(demand_t, demand_gw, demand_integral, f"{season} demand", "tan")
-
-    # factor in other 60% that is not electric
-    # gratuitously reduce primary energy assuming electric efficiency
-    # by 60%
-    # Today 40% of energy is electric so 60% is non-electric. But if we electrify
-    # everything let's assume the 60% chunk is itself reduced to 60%, or 36% of
-    # the original total. Then the total integral itself is also reduced to 40%+36%
-    # of the original (76%).  But since we're starting from electricity demand integral 
-    # we still have to increase the total
-    others_integral = demand_integral/0.4*0.6*0.6
-    total_integral = demand_integral  + others_integral
-    # flat line value in GW will equal integral in GWd since time is 1 day
-    others_gw = np.array([others_integral for dt in demand_dt])
-    others = Data(demand_t, others_gw, others_integral, "Transportation,Industry,Heating", "brown")
-
-    supply_dt, supply_mw = data[f"{season} solar"]
-    supply_t = np.array([dt.time().hour + dt.time().minute / 60 for dt in supply_dt])
-    supply_integral = _integrate_megawatts(supply_mw)
-    supply_gw = supply_mw/1000
-    supply = Data(
-        supply_t, supply_gw, supply_integral, f"{season} solar supply", "green"
-    )
-
-    if nonelectric:
-        factor = total_integral/supply_integral
-    else:
-        factor = demand_integral /supply_integral
-    scaled_gw = supply_gw * factor
-    scaled = Data(
-        supply_t,
-        scaled_gw,
-        supply_integral*factor,
-        f"{season} required supply",
-        "green",
-        "",
-        0.1,
-    )
-    return demand, supply, scaled, others
-
-
 def add_data(ax, data, x=12, y0=0.0):
     line, = ax.plot(
         data.time,
@@ -401,7 +244,7 @@ def plot_both_scenarios(data):
     # writer = ImageMagickFileWriter()
     # anim.save("animation.avi", writer=writer)
 
-def scene1_summer(season, data, showSupply=True):
+def scene1_summer(season, data, showSupply=True, fname=None):
     fig, axs = plt.subplots(1, 1,  squeeze=False, dpi=200)
     ax = axs[0][0]
     demand, supply, scaled, others = process(data, season)
@@ -447,7 +290,7 @@ def scene1_summer(season, data, showSupply=True):
         dmf=""
     else:
         dmf="demand-"
-    plt.savefig(f"solar-intermittency-scene1-{dmf}{season}.png")
+    plt.savefig(fname or f"solar-intermittency-scene1-{dmf}{season}.png")
 
 
 def scene2_scaleup(season, data, nonelectric=False):
@@ -578,6 +421,7 @@ def plot_frames_alone():
 
 
 if __name__ == "__main__":
+    matplotlib.use('TkAgg') 
     data = read_data()
     # plot_demand(data)
     # plot_solar_supply(data)
@@ -0,0 +1,193 @@
+"""
+Clear-sky solar geometry and PV output.
+
+The solar scenarios lean on two scraped CAISO days, and 2019-12-21 happened
+to be cloudy. This computes what the sun would do with no weather at all, for
+any latitude and day: the seasonal swing in a baseline that doesn't depend on
+which day you happened to download.
+
+Everything broadcasts, so a year of 5-minute steps for a column of latitudes
+is one array expression:
+
+    t = timestamps(2019)                       # (105120,)
+    lat = np.arange(-60, 61, 5)[:, None]       # (25, 1)
+    pv = pv_output(t, lat)                     # (25, 105120)
+
+Models are the standard textbook ones: Spencer (1971) declination and
+equation of time, Kasten & Young (1989) air mass, Meinel's clear-sky beam
+attenuation with ~10% diffuse on top, and an equator-facing fixed tilt.
+"""
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+SOLAR_CONSTANT = 1361.0  # W/m^2 at 1 AU
+STC = 1000.0  # W/m^2, what panel ratings are quoted at
+
+
+class Irradiance(typing.NamedTuple):
+    dni: np.ndarray  # direct normal, W/m^2
+    dhi: np.ndarray  # diffuse horizontal
+    ghi: np.ndarray  # global horizontal
+    cos_zenith: np.ndarray
+
+
+def timestamps(year, step=5):
+    """Every ``step`` minutes of a year, as datetime64[m] (local standard time)."""
+    start = np.datetime64(f"{year}-01-01T00:00", "m")
+    end = np.datetime64(f"{year + 1}-01-01T00:00", "m")
+    return np.arange(start, end, np.timedelta64(step, "m"))
+
+
+def _day_angle(times):
+    """Fractional year in radians, and hours into the day."""
+    times = np.asarray(times, dtype="datetime64[m]")
+    year_start = times.astype("datetime64[Y]")
+    days = (times - year_start).astype(float) / 1440.0
+    year_length = ((year_start + 1).astype("datetime64[D]") - year_start.astype("datetime64[D]")).astype(float)
+    hours = (days % 1.0) * 24
+    return 2 * np.pi * np.floor(days) / year_length, hours
+
+
+def declination(gamma):
+    """Solar declination (rad) from the day angle (Spencer)."""
+    return (
+        0.006918 - 0.399912 * np.cos(gamma) + 0.070257 * np.sin(gamma)
+        - 0.006758 * np.cos(2 * gamma) + 0.000907 * np.sin(2 * gamma)
+        - 0.002697 * np.cos(3 * gamma) + 0.00148 * np.sin(3 * gamma)
+    )
+
+
+def equation_of_time(gamma):
+    """Apparent minus mean solar time, in minutes (Spencer)."""
+    return 229.18 * (
+        0.000075 + 0.001868 * np.cos(gamma) - 0.032077 * np.sin(gamma)
+        - 0.014615 * np.cos(2 * gamma) - 0.040849 * np.sin(2 * gamma)
+    )
+
+
+def earth_sun_factor(gamma):
+    """(1 AU / r)^2, the inverse-square swing over the orbit (about +/-3.3%)."""
+    return (
+        1.00011 + 0.034221 * np.cos(gamma) + 0.00128 * np.sin(gamma)
+        + 0.000719 * np.cos(2 * gamma) + 0.000077 * np.sin(2 * gamma)
+    )
+
+
+def geometry(times, latitude, longitude=0.0, utc_offset=0.0):
+    """
+    Solar position for local standard ``times`` at each place.
+
+    Latitude and longitude are degrees (east positive) and broadcast against
+    times. Returns (cos_zenith, hour_angle, declination, day_angle), angles
+    in radians.
+    """
+    gamma, hours = _day_angle(times)
+    decl = declination(gamma)
+    # 4 minutes of solar time per degree away from the time zone's meridian
+    solar_hours = hours + (equation_of_time(gamma) + 4 * (np.asarray(longitude) - 15 * np.asarray(utc_offset))) / 60
+    hour_angle = np.radians(15 * (solar_hours - 12))
+    lat = np.radians(latitude)
+    cos_zenith = np.sin(lat) * np.sin(decl) + np.cos(lat) * np.cos(decl) * np.cos(hour_angle)
+    return cos_zenith, hour_angle, decl, gamma
+
+
+def air_mass(cos_zenith):
+    """Relative optical air mass (Kasten & Young), inf with the sun down."""
+    zenith = np.degrees(np.arccos(np.clip(cos_zenith, -1, 1)))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        am = 1 / (cos_zenith + 0.50572 * (96.07995 - zenith) ** -1.6364)
+    return np.where(zenith < 90, am, np.inf)
+
+
+def clear_sky(times, latitude, longitude=0.0, utc_offset=0.0):
+    """Clear-sky irradiance (Meinel) at each time and place."""
+    cos_zenith, _h, _d, gamma = geometry(times, latitude, longitude, utc_offset)
+    return _meinel(cos_zenith, gamma)
+
+
+def _meinel(cos_zenith, gamma):
+    am = air_mass(cos_zenith)
+    extra = SOLAR_CONSTANT * earth_sun_factor(gamma)
+    dni = extra * 0.7 ** (am**0.678)
+    up = np.maximum(cos_zenith, 0.0)
+    dhi = 0.1 * dni * up
+    return Irradiance(dni, dhi, dni * up + dhi, cos_zenith)
+
+
+def pv_output(times, latitude, longitude=0.0, utc_offset=0.0, tilt=None, derate=0.85, albedo=0.2):
+    """
+    Clear-sky PV output per unit of nameplate capacity (0 to ~1).
+
+    Panels face the equator at ``tilt`` degrees (default: the latitude, a
+    common fixed-tilt choice; 0 is flat). ``derate`` lumps inverter, wiring,
+    soiling and temperature losses.
+    """
+    cos_zenith, hour_angle, decl, gamma = geometry(times, latitude, longitude, utc_offset)
+    sky = _meinel(cos_zenith, gamma)
+    lat = np.radians(latitude)
+    beta = np.abs(lat) if tilt is None else np.radians(tilt) * np.ones_like(lat)
+    # an equator-facing plane at lat sees the sun like a flat one at lat -/+ tilt
+    hemi = np.where(np.asarray(lat) < 0, -1.0, 1.0)
+    cos_incidence = (
+        np.sin(hemi * decl) * np.sin(hemi * lat - beta)
+        + np.cos(decl) * np.cos(hour_angle) * np.cos(hemi * lat - beta)
+    )
+    beam = sky.dni * np.maximum(cos_incidence, 0.0) * (cos_zenith > 0)
+    diffuse = sky.dhi * (1 + np.cos(beta)) / 2 + sky.ghi * albedo * (1 - np.cos(beta)) / 2
+    return derate * (beam + diffuse) / STC
+
+
+def synthetic_day(date, capacity_mw, latitude=35.4, longitude=-119.0, utc_offset=-8, step=5, **kwargs):
+    """
+    A clear-sky solar day shaped like caiso.read_day() output.
+
+    Returns (datetimes, MW) so it can stand in for a scraped CAISO file. The
+    defaults are roughly the middle of California's solar fleet.
+    """
+    start = np.datetime64(date, "m")
+    times = np.arange(start, start + np.timedelta64(1, "D"), np.timedelta64(step, "m"))
+    mw = capacity_mw * pv_output(times, latitude, longitude, utc_offset, **kwargs)
+    return list(times.astype(object)), mw
+
+
+def plot(fname="clear-sky-solar.png", year=2019):
+    """Daily clear-sky PV yield by latitude and day, plus the two CAISO days."""
+    times = timestamps(year)
+    lats = np.arange(-60, 61, 2.5)[:, None]
+    pv = pv_output(times, lats)
+    # capacity factor per day: (lat, day)
+    daily = pv.reshape(len(lats), -1, 288).mean(axis=-1)
+
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(13, 5), dpi=150)
+    im = ax1.imshow(
+        daily * 100, aspect="auto", origin="lower", cmap="inferno",
+        extent=(0, daily.shape[1], lats[0, 0], lats[-1, 0]),
+    )
+    fig.colorbar(im, ax=ax1, label="Clear-sky daily capacity factor (%)")
+    ax1.set_xlabel(f"Day of {year}")
+    ax1.set_ylabel("Latitude (deg)")
+    ax1.set_title("Even with perfect weather, solar is seasonal")
+
+    for date, color in [(f"{year}-06-21", "tab:pink"), (f"{year}-12-21", "tab:cyan")]:
+        dts, mw = synthetic_day(date, 1.0)
+        hours = [dt.hour + dt.minute / 60 for dt in dts]
+        ax2.plot(hours, mw, color=color, lw=2, label=f"{date} ({mw.mean() * 100:.0f}% CF)")
+    ax2.set_xlim(0, 24)
+    ax2.set_xticks(np.arange(0, 25, 3.0))
+    ax2.set_ylim(bottom=0)
+    ax2.set_xlabel("Time (hour of day, PST)")
+    ax2.set_ylabel("Output per MW installed")
+    ax2.set_title("Clear-sky fixed-tilt PV in central California")
+    ax2.grid(alpha=0.3, ls="--")
+    ax2.legend(loc="upper left")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    plot()
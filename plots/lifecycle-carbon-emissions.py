@@ -12,7 +12,7 @@ import matplotlib.cm as cm
 
 def load(fname=os.path.join('..','data','energy-sources.yaml')):
     with open(fname) as f:
-        alldata = yaml.load(f)
+        alldata = yaml.safe_load(f)
         data = alldata['lifecycle emissions']
     return data
 
@@ -1,19 +1,24 @@
+import os
+import sys
 import textwrap
 import matplotlib.pyplot as plt
 
 import numpy as np
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+import seeding
 
-def generateData():
+
+def generateData(seed=seeding.SEED):
+    """Made-up study values with the same extremes, the same every run."""
     bounds = [3.7, 12,110]
 
     mu, sigma = bounds[1], 5
 
-    vals = [bounds[0]]+ list(np.random.normal(mu,sigma, 97)) + [bounds[2]]
+    rng = seeding.generator(seed)
+    vals = np.concatenate(([bounds[0]], rng.normal(mu, sigma, 97), [bounds[2]]))
+    vals = np.clip(vals, bounds[0], bounds[2])
 
-    vals = [bounds[0] if v<bounds[0] else v for v in vals]
-    vals = [bounds[2] if v>bounds[2] else v for v in vals]
-    
     return range(len(vals)), vals
 
 def plot(labels, vals):
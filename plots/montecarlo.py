@@ -0,0 +1,361 @@
+"""
+A teaching Monte Carlo neutron transport kernel.
+
+This is the runnable version of the "Monte Carlo: basics" slide in
+slides/Computational Methods:
+
+* Roll dice: sample distance to next interaction
+* Sample from cross section data to choose reaction
+* Sample outgoing energy (group) and direction
+* Repeat, tallying up track length and reaction rates
+
+Geometry is a 1-D slab (infinite in y and z) or a sphere, each made of
+concentric regions of multigroup materials. It solves the k-eigenvalue problem
+by power iteration over fission generations.
+
+Particles are stored as arrays (one array per attribute) and moved
+event-by-event, so each step is a handful of NumPy operations over every
+living neutron instead of a Python loop per history. Each generation is split
+into a fixed number of batches that can be farmed out to a process pool.
+Every batch gets its own random stream from a SeedSequence (see seeding.py),
+so the answer doesn't depend on how many processes you use.
+"""
+import multiprocessing
+import time
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+
+import seeding
+
+
+class Material(typing.NamedTuple):
+    """Multigroup macroscopic cross sections (1/cm). Group 0 is the fastest."""
+
+    name: str
+    total: np.ndarray
+    scatter: np.ndarray  # [from, to]
+    nu_fission: np.ndarray
+    chi: np.ndarray
+
+    @property
+    def absorption(self):
+        return self.total - self.scatter.sum(axis=1)
+
+    @property
+    def diffusion_coefficient(self):
+        # isotropic scattering so transport == total
+        return 1.0 / (3.0 * self.total)
+
+
+class Problem(typing.NamedTuple):
+    """Regions are bounded by ``edges`` (cm). Spheres must start at 0."""
+
+    geometry: str  # "slab" or "sphere"
+    edges: np.ndarray
+    materials: list
+    left: str = "vacuum"  # slab only; "reflective" for a half-core
+
+    @property
+    def groups(self):
+        return len(self.materials[0].total)
+
+
+class Result(typing.NamedTuple):
+    k: np.ndarray  # collision estimate per active generation
+    k_track: np.ndarray  # track-length estimate per active generation
+    leakage: np.ndarray  # fraction of source leaking per active generation
+    mesh: np.ndarray  # flux tally mesh edges (cm)
+    flux: np.ndarray  # [mesh bin, group], per source neutron per unit volume
+    particles: int
+    seconds: float
+
+    @property
+    def keff(self):
+        return self.k.mean()
+
+    @property
+    def keff_std(self):
+        return self.k.std(ddof=1) / np.sqrt(len(self.k))
+
+
+FUEL = Material(
+    "fuel",
+    total=np.array([0.238, 0.833]),
+    scatter=np.array([[0.208, 0.020], [0.0, 0.753]]),
+    nu_fission=np.array([0.005, 0.135]),
+    chi=np.array([1.0, 0.0]),
+)
+
+WATER = Material(
+    "water",
+    total=np.array([0.303, 2.08]),
+    scatter=np.array([[0.2626, 0.040], [0.0, 2.06]]),
+    nu_fission=np.zeros(2),
+    chi=np.array([1.0, 0.0]),
+)
+
+
+def reflected_slab():
+    """A 100 cm fuel slab with 20 cm of water on either side."""
+    return Problem("slab", np.array([0.0, 20.0, 120.0, 140.0]), [WATER, FUEL, WATER])
+
+
+def bare_sphere(radius=60.0):
+    return Problem("sphere", np.array([0.0, radius]), [FUEL])
+
+
+class _XS(typing.NamedTuple):
+    """Cross sections stacked by region so lookups are one fancy index."""
+
+    total: np.ndarray
+    nu_fission: np.ndarray
+    scatter_prob: np.ndarray
+    scatter_cdf: np.ndarray
+    chi_cdf: np.ndarray
+
+
+def _stack(problem):
+    total = np.array([m.total for m in problem.materials])
+    scatter = np.array([m.scatter for m in problem.materials])
+    out = scatter.sum(axis=2)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        cdf = np.nan_to_num(np.cumsum(scatter, axis=2) / out[..., None], nan=1.0)
+    return _XS(
+        total,
+        np.array([m.nu_fission for m in problem.materials]),
+        out / total,
+        cdf,
+        np.cumsum([m.chi for m in problem.materials], axis=1),
+    )
+
+
+def _sample_cdf(cdf, rng):
+    """Pick a bin from each row of a cumulative table."""
+    return (rng.random(len(cdf))[:, None] > cdf).sum(axis=1).clip(max=cdf.shape[1] - 1)
+
+
+def _distance_to_boundary(problem, pos, mu, region):
+    """Distance to leave the current region and which way (+1 out, -1 in)."""
+    lo = problem.edges[region]
+    hi = problem.edges[region + 1]
+    if problem.geometry == "slab":
+        with np.errstate(divide="ignore"):
+            d = np.where(mu > 0, (hi - pos) / mu, (lo - pos) / mu)
+        return np.maximum(d, 0.0), np.where(mu > 0, 1, -1)
+    # sphere: pos is radius, mu is the cosine to the radial direction
+    perp2 = pos**2 * (1.0 - mu**2)
+    inward = (mu < 0) & (perp2 < lo**2)
+    d_in = -pos * mu - np.sqrt(np.maximum(lo**2 - perp2, 0.0))
+    d_out = -pos * mu + np.sqrt(np.maximum(hi**2 - perp2, 0.0))
+    return np.maximum(np.where(inward, d_in, d_out), 0.0), np.where(inward, -1, 1)
+
+
+def transport(problem, pos, group, seed, mesh):
+    """
+    Follow one batch of source neutrons until every one is absorbed or leaks.
+
+    Returns the fission bank (positions, groups) and the batch tallies.
+    """
+    rng = seeding.generator(seed)
+    xs = _stack(problem)
+    nregions = len(problem.materials)
+    ngroups = problem.groups
+
+    region = (np.searchsorted(problem.edges, pos, side="right") - 1).clip(0, nregions - 1)
+    mu = 2.0 * rng.random(len(pos)) - 1.0
+    flux = np.zeros((len(mesh) - 1) * ngroups)
+    k_track = 0.0
+    leaked = 0
+    bank_pos = []
+    bank_group = []
+
+    while len(pos):
+        sig_t = xs.total[region, group]
+        d_coll = -np.log(rng.random(len(pos))) / sig_t
+        d_bound, direction = _distance_to_boundary(problem, pos, mu, region)
+        cross = d_bound < d_coll
+        d = np.where(cross, d_bound, d_coll)
+        k_track += (d * xs.nu_fission[region, group]).sum()
+
+        if problem.geometry == "slab":
+            pos = pos + d * mu
+        else:
+            new = np.sqrt(np.maximum(pos**2 + 2 * pos * d * mu + d**2, 0.0))
+            with np.errstate(invalid="ignore", divide="ignore"):
+                mu = np.where(new > 0, (pos * mu + d) / new, 1.0)
+            pos = new
+
+        # surface crossings just change region; the next event resamples
+        # the flight distance since the material changed
+        region = np.where(cross, region + direction, region)
+        if problem.geometry == "slab" and problem.left == "reflective":
+            bounce = region < 0
+            region[bounce] = 0
+            mu[bounce] *= -1
+        escaped = (region < 0) | (region >= nregions)
+        leaked += escaped.sum()
+
+        # collisions: tally flux, bank fission sites, then scatter or absorb
+        hit = ~cross
+        c_pos, c_group, c_region = pos[hit], group[hit], region[hit]
+        c_sig_t = sig_t[hit]
+        bins = (np.searchsorted(mesh, c_pos, side="right") - 1).clip(0, len(mesh) - 2)
+        flux += np.bincount(bins * ngroups + c_group, weights=1.0 / c_sig_t, minlength=len(flux))
+
+        nu = xs.nu_fission[c_region, c_group] / c_sig_t
+        sites = np.floor(nu + rng.random(len(nu))).astype(int)
+        if sites.any():
+            bank_pos.append(np.repeat(c_pos, sites))
+            bank_region = np.repeat(c_region, sites)
+            bank_group.append(_sample_cdf(xs.chi_cdf[bank_region], rng))
+
+        scattered = rng.random(len(c_pos)) < xs.scatter_prob[c_region, c_group]
+        new_group = c_group.copy()
+        s = scattered
+        new_group[s] = _sample_cdf(xs.scatter_cdf[c_region[s], c_group[s]], rng)
+        group = group.copy()
+        group[hit] = new_group
+        mu[np.flatnonzero(hit)[s]] = 2.0 * rng.random(s.sum()) - 1.0
+
+        alive = ~escaped
+        alive[np.flatnonzero(hit)[~s]] = False
+        pos, mu, group, region = pos[alive], mu[alive], group[alive], region[alive]
+
+    bank = (
+        np.concatenate(bank_pos) if bank_pos else np.zeros(0),
+        np.concatenate(bank_group) if bank_group else np.zeros(0, dtype=int),
+    )
+    return bank, flux.reshape(-1, ngroups), k_track, leaked
+
+
+def _transport_batch(args):
+    return transport(*args)
+
+
+def _initial_source(problem, particles, rng):
+    fissile = [i for i, m in enumerate(problem.materials) if m.nu_fission.any()]
+    region = rng.choice(fissile, particles)
+    lo, hi = problem.edges[region], problem.edges[region + 1]
+    if problem.geometry == "sphere":
+        # uniform in volume
+        pos = (lo**3 + rng.random(particles) * (hi**3 - lo**3)) ** (1 / 3)
+    else:
+        pos = lo + rng.random(particles) * (hi - lo)
+    group = _sample_cdf(np.cumsum([problem.materials[r].chi for r in region], axis=1), rng)
+    return pos, group
+
+
+def _volumes(problem, mesh):
+    if problem.geometry == "sphere":
+        return 4.0 / 3.0 * np.pi * np.diff(mesh**3)
+    return np.diff(mesh)
+
+
+def run(
+    problem,
+    particles=10000,
+    generations=60,
+    inactive=20,
+    batches=8,
+    processes=None,
+    seed=seeding.SEED,
+    mesh_bins=70,
+):
+    """
+    Solve for k-effective by power iteration over fission generations.
+
+    ``processes`` > 1 transports the batches of each generation in a pool.
+    Results are identical for any number of processes.
+    """
+    start = time.perf_counter()
+    seeds = seeding.seeds(seed)
+    rng = seeding.generator(seeding.streams(seeds, 1)[0])
+    mesh = np.linspace(problem.edges[0], problem.edges[-1], mesh_bins + 1)
+    pos, group = _initial_source(problem, particles, rng)
+
+    # one pool for every generation, rather than one per pool_map() call
+    pool = seeding.pool(processes)
+    k, k_track, leakage = [], [], []
+    flux = np.zeros((mesh_bins, problem.groups))
+    try:
+        for gen, gen_seed in enumerate(seeding.streams(seeds, generations)):
+            chunks = zip(np.array_split(pos, batches), np.array_split(group, batches))
+            jobs = [
+                (problem, p, g, s, mesh)
+                for (p, g), s in zip(chunks, seeding.streams(gen_seed, batches))
+            ]
+            results = list(seeding.pool_map(_transport_batch, jobs, pool=pool))
+            bank_pos = np.concatenate([r[0][0] for r in results])
+            bank_group = np.concatenate([r[0][1] for r in results])
+            if not len(bank_pos):
+                raise RuntimeError("Fission source died out; problem is far subcritical")
+            if gen >= inactive:
+                k.append(len(bank_pos) / len(pos))
+                k_track.append(sum(r[2] for r in results) / len(pos))
+                leakage.append(sum(r[3] for r in results) / len(pos))
+                flux += sum(r[1] for r in results) / len(pos)
+
+            # renormalize the bank to a constant population
+            pick = rng.choice(len(bank_pos), particles, replace=len(bank_pos) < particles)
+            pos, group = bank_pos[pick], bank_group[pick]
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+
+    flux /= max(generations - inactive, 1) * _volumes(problem, mesh)[:, None]
+    return Result(
+        np.array(k),
+        np.array(k_track),
+        np.array(leakage),
+        mesh,
+        flux,
+        particles,
+        time.perf_counter() - start,
+    )
+
+
+def plot_convergence(problem, counts=(100, 300, 1000, 3000, 10000, 30000), fname="mc-convergence.png", **kwargs):
+    """Show k-effective and its uncertainty shrinking as particle count grows."""
+    results = [run(problem, particles=n, **kwargs) for n in counts]
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(11, 4.5), dpi=150)
+    ax1.errorbar(
+        counts,
+        [r.keff for r in results],
+        yerr=[r.keff_std for r in results],
+        fmt="o-",
+        capsize=3,
+    )
+    ax1.set_xscale("log")
+    ax1.set_xlabel("Neutrons per generation")
+    ax1.set_ylabel("k-effective")
+    ax1.set_title("Monte Carlo convergence")
+    ax1.grid(alpha=0.3, ls="--")
+
+    best = results[-1]
+    centers = 0.5 * (best.mesh[1:] + best.mesh[:-1])
+    for g in range(problem.groups):
+        ax2.step(centers, best.flux[:, g], where="mid", label=f"Group {g+1}")
+    for edge in problem.edges[1:-1]:
+        ax2.axvline(edge, color="0.5", ls="--", lw=0.8)
+    ax2.set_xlabel("Radius (cm)" if problem.geometry == "sphere" else "Position (cm)")
+    ax2.set_ylabel("Flux (per source neutron)")
+    ax2.set_title(f"Flux with {best.particles} neutrons/generation")
+    ax2.legend()
+    ax2.grid(alpha=0.3, ls="--")
+    fig.tight_layout()
+    for n, r in zip(counts, results):
+        print(
+            f"{n:>8} neutrons: k = {r.keff:.5f} +/- {r.keff_std:.5f} "
+            f"(track {r.k_track.mean():.5f}), leakage {r.leakage.mean():.4f}, {r.seconds:.1f} s"
+        )
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == "__main__":
+    plot_convergence(reflected_slab(), processes=multiprocessing.cpu_count())
@@ -1,16 +1,16 @@
 import os
 
-import pandas as pd
-from pandas import ExcelWriter
-from pandas import ExcelFile
-
 import matplotlib.pyplot as plt
 
-df = pd.read_excel(os.path.join('..','data','Table_8.1_Nuclear_Energy_Overview.xlsx'), sheet_name='Nick')
-dates = [d.to_pydatetime() for d in df["Month"]]
+from eia import load_table, rolling
+
+months, values, names = load_table(os.path.join('..','data','Table_8.1_Nuclear_Energy_Overview.xlsx'), sheet='Nick')
+stats = rolling(values)
+dates = months.astype('datetime64[D]').astype(object)
 endyear = dates[-1].year
-cf = df["Nuclear Generating Units, Capacity Factor"]
-avg = cf.rolling(12).mean()
+col = names.index("Nuclear Generating Units, Capacity Factor")
+cf = values[:, col]
+avg = stats["mean"][:, col]
 fig, ax = plt.subplots(figsize=(11,7))
 ax.bar(dates, cf, width=31, color='lightskyblue', label="Monthly")
 ax.xaxis_date()
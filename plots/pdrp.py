@@ -14,11 +14,13 @@ import matplotlib.dates as mdates
 import matplotlib.patches as mpatches
 from matplotlib.collections import PatchCollection
 
+import bigraster
+
 ISOFMT = "%Y-%M-%d"
 
 def load(fname=os.path.join('..','data','pdrp.yaml')):
     with open(fname) as f:
-        data = yaml.load(f)
+        data = yaml.safe_load(f)
     return data["reactors"]
 
 def dt(date):
@@ -34,7 +36,7 @@ LINEHEIGHT = 0.1
 STARTYEAR = 1951
 ENDYEAR=1977
 
-def plot(data, fname='power-demonstration-reactor-program.png'):
+def plot(data, fname='power-demonstration-reactor-program.png', startyear=STARTYEAR, endyear=ENDYEAR):
 
     fig, ax = plt.subplots(figsize=(16,14))
 
@@ -102,9 +104,9 @@ def plot(data, fname='power-demonstration-reactor-program.png'):
             patches.append(mpatches.Ellipse((shutdown,y), DOTWIDTH, 0.25, facecolor="k", edgecolor="k", lw=0.2))
             ax.barh(y, shutdown-fullpower, left=fullpower, height=LINEHEIGHT, color="green", alpha=1.0)
 
-            if rxdata["shutdown"].year > ENDYEAR:
+            if rxdata["shutdown"].year > endyear:
                 # add overflow label
-                labeltime = dt(datetime.datetime(ENDYEAR-2, 6, 1))
+                labeltime = dt(datetime.datetime(endyear-2, 6, 1))
                 ax.annotate(f'{rxdata["shutdown"].year} →',
                             xy=(labeltime, y),
                             xytext=(5, 8),  
@@ -136,8 +138,8 @@ def plot(data, fname='power-demonstration-reactor-program.png'):
     #ax.set_yticklabels(reactors)
     plt.title("The Power Demonstration Reactor Program", fontsize=16)
     #ax.set_ylim([0,900]) # make room for data label
-    ax.set_xlim([date2num(datetime.datetime(STARTYEAR,1,1)),
-                 date2num(datetime.datetime(ENDYEAR,1,1))])
+    ax.set_xlim([date2num(datetime.datetime(startyear,1,1)),
+                 date2num(datetime.datetime(endyear,1,1))])
     ax.xaxis.tick_top()
     #ax.xaxis.set_label_position('bottom')
     ax.tick_params(direction="in", labelsize=14)
@@ -150,7 +152,7 @@ def plot(data, fname='power-demonstration-reactor-program.png'):
                   )
 
     if fname:
-        plt.savefig(fname)
+        bigraster.savefig(fig, fname)
     else:
         plt.show()
 
@@ -0,0 +1,231 @@
+"""
+Ensembles of future energy use: when do resources run out, how much CO2?
+
+Starts from energy-sources.yaml: world consumption by source (2019, EJ),
+world resources (ZJ) and the world CO2 series. The growth rate of demand is
+fit to the CO2 history (log-linear least squares; it's the only series we
+have and emissions have tracked primary energy closely). Each trajectory
+then draws
+
+* a demand growth rate around that fit (``growth_spread`` per year),
+* a substitution rate: the fraction of remaining fossil use replaced each
+  year, and
+* how much of the replacement is nuclear (the rest being hydro and other
+  renewables, which don't draw down a resource).
+
+Every trajectory runs at once as (trajectories, years) arrays, in chunks of
+``chunk`` so the temporaries stay a fixed size. Chunks draw from their own
+random streams (seeding.py) and can run in a process pool; the result is
+the same for any number of processes. Only the per-year emissions
+(float32) and the depletion year of each resource are kept. A million
+trajectories is ~330 MB of results.
+
+    python projections.py --trajectories 50000 --processes 4
+
+The resource numbers are very rough (see the notes in the yaml), so read
+the years of supply as orders of magnitude.
+"""
+import argparse
+import os
+import typing
+
+import numpy as np
+import matplotlib.pyplot as plt
+import yaml
+
+import seeding
+
+# which consumption row draws down which resource
+RESOURCES = {"coal": "coal", "gas": "natural gas", "oil": "oil", "uranium": "nuclear"}
+FOSSIL = ["coal", "natural gas", "oil"]
+END = 2100
+PERCENTILES = (5, 25, 50, 75, 95)
+
+
+class Priors(typing.NamedTuple):
+    growth_spread: float = 0.01  # sd of demand growth rate, 1/yr
+    substitution: tuple = (0.0, 0.05)  # uniform range, fraction of fossil replaced per yr
+    nuclear_share: tuple = (0.0, 1.0)  # uniform range
+
+
+class History(typing.NamedTuple):
+    base_year: int  # year of the consumption numbers
+    consumption: dict  # EJ/yr by source
+    resources: dict  # ZJ
+    co2_years: np.ndarray
+    co2: np.ndarray  # Mt/yr, world
+    growth: float  # fitted, 1/yr
+    growth_se: float
+
+
+class Ensemble(typing.NamedTuple):
+    years: np.ndarray
+    emissions: np.ndarray  # (trajectories, years) Gt CO2/yr, float32
+    depletion: np.ndarray  # (trajectories, resources) year exhausted, inf if after END
+    resources: list
+    params: dict  # name -> (trajectories,) the draws
+    seed: int  # entropy of the SeedSequence; pass as seed= to repeat the run
+
+
+def fit_growth(years, values):
+    """Least-squares exponential growth rate and its standard error."""
+    x = np.asarray(years, dtype=float) - np.mean(years)
+    y = np.log(values)
+    slope = (x @ (y - y.mean())) / (x @ x)
+    resid = y - y.mean() - slope * x
+    se = np.sqrt(resid @ resid / (len(x) - 2) / (x @ x))
+    return slope, se
+
+
+def load(fname=os.path.join('..', 'data', 'energy-sources.yaml'), base_year=2019):
+    with open(fname) as f:
+        alldata = yaml.safe_load(f)
+    co2 = alldata['co2 emissions']
+    world = np.array(co2['val']['World'])
+    years = co2.get('start', 2008) + np.arange(len(world))
+    growth, se = fit_growth(years, world)
+    return History(
+        base_year,
+        alldata['worldwide consumption']['val'],
+        alldata['worldwide resources']['val'],
+        years,
+        world,
+        growth,
+        se,
+    )
+
+
+def _chunk(history, years, growth, substitution, nuclear_share):
+    """Emissions (n, years) and depletion years (n, resources) for one chunk."""
+    t = (years - history.base_year)[None, :].astype(float)
+    demand = np.exp(growth[:, None] * t)
+    # fossil use still left after substitution, relative to today
+    keep = np.exp(-substitution[:, None] * t)
+    fossil_total = sum(history.consumption[f] for f in FOSSIL)
+
+    depletion = np.full((len(growth), len(RESOURCES)), np.inf)
+    for j, (resource, source) in enumerate(RESOURCES.items()):
+        use = history.consumption[source] * demand
+        if source in FOSSIL:
+            use = use * keep
+        else:
+            use = use + nuclear_share[:, None] * fossil_total * (1 - keep) * demand
+        # EJ -> ZJ
+        used = np.cumsum(use, axis=1) / 1000
+        out = used >= history.resources[resource]
+        hit = out.any(axis=1)
+        depletion[hit, j] = years[np.argmax(out[hit], axis=1)]
+
+    # emissions follow fossil use, from the last year of CO2 history
+    last = history.co2[-1] * np.exp(growth * (history.base_year - history.co2_years[-1]))
+    emissions = (last[:, None] / 1000) * demand * keep
+    return emissions.astype(np.float32), depletion
+
+
+def _draw(history, priors, rng, n):
+    return {
+        "growth": rng.normal(history.growth, np.hypot(history.growth_se, priors.growth_spread), n),
+        "substitution": rng.uniform(*priors.substitution, n),
+        "nuclear share": rng.uniform(*priors.nuclear_share, n),
+    }
+
+
+def _run_chunk(args):
+    history, years, priors, seed, n = args
+    params = _draw(history, priors, seeding.generator(seed), n)
+    emissions, depletion = _chunk(history, years, params["growth"], params["substitution"], params["nuclear share"])
+    return params, emissions, depletion
+
+
+def run(history, trajectories=10000, priors=Priors(), seed=seeding.SEED, chunk=20000, end=END, processes=None):
+    """
+    Draw and evaluate an ensemble of trajectories.
+
+    Each chunk draws from its own stream, so the ensemble is the same for
+    any ``processes``; changing ``chunk`` changes the draws. Chunks are
+    copied into the result as they finish.
+    """
+    years = np.arange(history.base_year, end + 1)
+    seeds = seeding.seeds(seed)
+    slices = seeding.chunks(trajectories, chunk)
+    jobs = [
+        (history, years, priors, s, piece.stop - piece.start)
+        for piece, s in zip(slices, seeding.streams(seeds, len(slices)))
+    ]
+    params = {name: np.empty(trajectories) for name in ("growth", "substitution", "nuclear share")}
+    emissions = np.empty((trajectories, len(years)), dtype=np.float32)
+    depletion = np.empty((trajectories, len(RESOURCES)))
+    for piece, (p, e, d) in zip(slices, seeding.pool_map(_run_chunk, jobs, processes)):
+        for name in params:
+            params[name][piece] = p[name]
+        emissions[piece], depletion[piece] = e, d
+    return Ensemble(years, emissions, depletion, list(RESOURCES), params, seeds.entropy)
+
+
+def fan(values, percentiles=PERCENTILES):
+    """Percentiles across trajectories at each year: (len(percentiles), years)."""
+    return np.percentile(values, percentiles, axis=0)
+
+
+def years_of_supply(ensemble, percentiles=PERCENTILES):
+    """
+    {resource: (years at each percentile, fraction lasting past the end)}.
+
+    inf means not used up within the horizon at that percentile.
+    """
+    out = {}
+    for j, resource in enumerate(ensemble.resources):
+        years = ensemble.depletion[:, j] - ensemble.years[0]
+        # "nearest" so inf stays inf instead of turning into nan
+        out[resource] = (np.percentile(years, percentiles, method="nearest"), np.isinf(years).mean())
+    return out
+
+
+def plot(history, ensemble, fname='co2-projections.png'):
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(13, 5), dpi=150)
+    years = ensemble.years
+    for ax, values, label in [
+        (ax1, ensemble.emissions, "Annual emissions (Gt CO$_2$/yr)"),
+        (ax2, np.cumsum(ensemble.emissions, axis=1, dtype=float), f"Cumulative emissions since {years[0]} (Gt CO$_2$)"),
+    ]:
+        bands = fan(values)
+        ax.fill_between(years, bands[0], bands[-1], color="tab:red", alpha=0.15, lw=0, label="5-95%")
+        ax.fill_between(years, bands[1], bands[-2], color="tab:red", alpha=0.3, lw=0, label="25-75%")
+        ax.plot(years, bands[2], color="tab:red", lw=2, label="Median")
+        ax.set_ylabel(label)
+        ax.set_xlabel("Year")
+        ax.grid(alpha=0.3, ls="--")
+    ax1.plot(history.co2_years, history.co2 / 1000, "k-o", ms=3, label="History")
+    ax1.set_title(f"{len(ensemble.emissions):,} trajectories, fit growth {100 * history.growth:.2f}%/yr")
+    ax1.legend(loc="upper left")
+
+    lines = []
+    for resource, (pct, lasting) in years_of_supply(ensemble).items():
+        median = "beyond {}".format(years[-1]) if np.isinf(pct[2]) else f"{pct[2]:.0f} yr"
+        lines.append(f"{resource}: median {median}, {100 * lasting:.0f}% last past {years[-1]}")
+    ax2.text(0.02, 0.98, "Years of supply\n" + "\n".join(lines), transform=ax2.transAxes,
+             va="top", fontsize="x-small", bbox=dict(fc="w", ec="0.7"))
+    ax2.set_title("Cumulative CO$_2$")
+    fig.tight_layout()
+    if fname:
+        plt.savefig(fname)
+    else:
+        plt.show()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--trajectories", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=seeding.SEED, help="-1 for a fresh one")
+    parser.add_argument("--chunk", type=int, default=20000)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--fname", default='co2-projections.png')
+    args = parser.parse_args()
+
+    history = load()
+    seed = None if args.seed < 0 else args.seed
+    ensemble = run(history, args.trajectories, seed=seed, chunk=args.chunk, processes=args.processes)
+    print(f"seed {ensemble.seed}")
+    for resource, (pct, lasting) in years_of_supply(ensemble).items():
+        print(f"{resource:8} years of supply at {PERCENTILES} percentiles: {pct}, {100 * lasting:.0f}% past {END}")
+    plot(history, ensemble, args.fname or None)
@@ -0,0 +1,373 @@
+"""
+Serve figures on request instead of committing PNGs.
+
+    python serve.py --port 8000 --workers 4
+
+then e.g.
+
+    http://localhost:8000/
+    http://localhost:8000/lifecycle-emissions?format=svg
+    http://localhost:8000/capacity-factors?dpi=150
+    http://localhost:8000/pdrp?start=1955&end=1970&format=png
+    http://localhost:8000/solar-scene?season=Winter&supply=0
+
+The existing plot() functions do the drawing. Each worker process loads every
+dataset once when it starts and keeps it, and renders with the Agg backend
+(pyplot isn't thread safe, so the pool is processes). Finished images go in an
+LRU cache bounded by total bytes, keyed by the normalized query (defaults
+filled in, values coerced, order ignored), so ``?dpi=100&format=png`` and
+``?format=png`` are the same entry. Identical requests that arrive while a
+render is in flight wait for that render instead of starting their own. The
+usual variants are rendered at startup. ETags also cover the mtimes and sizes
+of each figure's code and data when the server started, so a restart with
+new data or code gives new ones.
+"""
+import argparse
+import collections
+import concurrent.futures
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import sys
+import threading
+import time
+import typing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA = os.path.join(HERE, "..", "data")
+FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+    "pdf": "application/pdf",
+}
+DPI_RANGE = (30, 600)
+YEARS = range(1900, 2101)
+
+
+class Figure(typing.NamedTuple):
+    script: str  # relative to plots/
+    load: typing.Callable  # module -> data, run once per worker
+    render: typing.Callable  # (module, data, fname, **params)
+    params: dict  # name -> (type, default, allowed values, a range or None)
+    check: typing.Callable = None  # params -> None, raises ValueError
+    inputs: tuple = ()  # data files and directories load reads
+
+
+def _load_lifecycle(module):
+    return module.load(os.path.join(DATA, "energy-sources.yaml"))
+
+
+def _load_capacity_factors(module):
+    return module.load(os.path.join(DATA, "energy-sources.yaml"))
+
+
+def _load_pdrp(module):
+    return module.load(os.path.join(DATA, "pdrp.yaml"))
+
+
+def _load_caiso(module):
+    return module.read_data(os.path.join(HERE, "intermittency", "data"))
+
+
+def _render_plot(module, data, fname):
+    module.plot(data, fname)
+
+
+def _render_pdrp(module, data, fname, start, end):
+    module.plot(data, fname, startyear=start, endyear=end)
+
+
+def _render_solar_scene(module, data, fname, season, supply):
+    module.scene1_summer(season, data, showSupply=supply, fname=fname)
+
+
+def _check_pdrp(params):
+    if params["start"] >= params["end"]:
+        raise ValueError("start must be before end")
+
+
+def _bool(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+FIGURES = {
+    "lifecycle-emissions": Figure(
+        "lifecycle-carbon-emissions.py", _load_lifecycle, _render_plot, {},
+        inputs=(os.path.join(DATA, "energy-sources.yaml"),),
+    ),
+    "capacity-factors": Figure(
+        "capacity-factors-usa.py", _load_capacity_factors, _render_plot, {},
+        inputs=(os.path.join(DATA, "energy-sources.yaml"),),
+    ),
+    "pdrp": Figure(
+        "pdrp.py", _load_pdrp, _render_pdrp,
+        {"start": (int, 1951, YEARS), "end": (int, 1977, YEARS)}, _check_pdrp,
+        inputs=(os.path.join(DATA, "pdrp.yaml"),),
+    ),
+    "solar-scene": Figure(
+        os.path.join("intermittency", "solar-vs-nuclear-cali.py"), _load_caiso, _render_solar_scene,
+        {"season": (str, "Summer", ("Summer", "Winter")), "supply": (_bool, True, None)},
+        inputs=(os.path.join(HERE, "intermittency", "data"),),
+    ),
+}
+
+# what gets rendered before the first request
+WARM = [
+    ("lifecycle-emissions", {}),
+    ("lifecycle-emissions", {"format": "svg"}),
+    ("capacity-factors", {}),
+    ("pdrp", {}),
+    ("solar-scene", {"season": "Summer"}),
+    ("solar-scene", {"season": "Winter"}),
+]
+
+
+def normalize(name, query):
+    """
+    Validate a request and return its cache key.
+
+    ``query`` maps parameter names to strings (or lists of strings, as from
+    parse_qs). Raises KeyError for an unknown figure and ValueError for bad
+    parameters.
+    """
+    figure = FIGURES[name]
+    query = {k: v[-1] if isinstance(v, list) else v for k, v in query.items()}
+    fmt = query.pop("format", "png").lower()
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    dpi = int(query.pop("dpi", 100))
+    if not DPI_RANGE[0] <= dpi <= DPI_RANGE[1]:
+        raise ValueError(f"dpi must be within {DPI_RANGE}")
+    params = {}
+    for pname, (kind, default, allowed) in figure.params.items():
+        value = kind(query.pop(pname)) if pname in query else default
+        if allowed and value not in allowed:
+            if isinstance(allowed, range):
+                raise ValueError(f"{pname} must be within ({allowed.start}, {allowed.stop - 1})")
+            raise ValueError(f"{pname} must be one of {', '.join(map(str, allowed))}")
+        params[pname] = value
+    if query:
+        raise ValueError(f"unknown parameters: {', '.join(sorted(query))}")
+    if figure.check:
+        figure.check(params)
+    return (name, fmt, dpi, tuple(sorted(params.items())))
+
+
+def fingerprint(figure):
+    """
+    Hash of the mtime and size of everything behind a figure: its data, the
+    scripts next to its own (which it may import) and this file.
+    """
+    code = os.path.dirname(os.path.join(HERE, figure.script))
+    paths = [os.path.abspath(__file__)]
+    paths += sorted(os.path.join(code, f) for f in os.listdir(code) if f.endswith(".py"))
+    for path in figure.inputs:
+        if os.path.isdir(path):
+            for root, dirs, files in os.walk(path):
+                dirs.sort()
+                paths += [os.path.join(root, f) for f in sorted(files)]
+        else:
+            paths.append(path)
+    digest = hashlib.sha1()
+    for path in paths:
+        try:
+            stat = os.stat(path)
+            digest.update(repr((path, stat.st_mtime_ns, stat.st_size)).encode())
+        except OSError:
+            digest.update(repr((path, None)).encode())
+    return digest.hexdigest()
+
+
+# --- worker side ---------------------------------------------------------
+
+_modules = {}
+_datasets = {}
+
+
+def _import(script):
+    """Import a plot script by path (most have dashes in their names)."""
+    path = os.path.join(HERE, script)
+    # scripts import their neighbours, e.g. caiso.py next to the solar plots
+    if os.path.dirname(path) not in sys.path:
+        sys.path.insert(0, os.path.dirname(path))
+    spec = importlib.util.spec_from_file_location(os.path.splitext(os.path.basename(script))[0].replace("-", "_"), path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+    for name, figure in FIGURES.items():
+        try:
+            module = _modules.setdefault(figure.script, _import(figure.script))
+            _datasets[name] = figure.load(module)
+        except Exception as exc:
+            # leave it out, whatever went wrong; requests for it get a 503
+            # (an exception escaping an initializer breaks the whole pool)
+            _datasets[name] = exc
+
+
+def _render(key):
+    """Draw one figure and return the file contents."""
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    name, fmt, dpi, params = key
+    figure = FIGURES[name]
+    data = _datasets[name]
+    if isinstance(data, Exception):
+        raise LookupError(f"{name} data unavailable: {data}")
+    buf = io.BytesIO()
+    try:
+        with matplotlib.rc_context({"savefig.format": fmt, "savefig.dpi": dpi}):
+            figure.render(_modules[figure.script], data, buf, **dict(params))
+    finally:
+        plt.close("all")
+    return buf.getvalue()
+
+
+# --- server side ---------------------------------------------------------
+
+
+class RenderCache:
+    """
+    Thread-safe LRU of rendered images, bounded by total size in bytes.
+
+    get() renders through the pool on a miss. Concurrent misses for the same
+    key share one render.
+    """
+
+    def __init__(self, pool, max_bytes=256 * 2**20):
+        self.pool = pool
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self._items = collections.OrderedDict()
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def _future(self, key):
+        """Return (cached bytes or None, future or None) under the lock."""
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key], None
+            if key in self._pending:
+                return None, self._pending[key]
+            future = self._pending[key] = self.pool.submit(_render, key)
+        # outside the lock: the callback takes it, and may run right away
+        future.add_done_callback(lambda f: self._store(key, f))
+        return None, future
+
+    def _store(self, key, future):
+        with self._lock:
+            self._pending.pop(key, None)
+            if future.cancelled() or future.exception() is not None:
+                return
+            body = future.result()
+            if len(body) > self.max_bytes:
+                return
+            self._items[key] = body
+            self.nbytes += len(body)
+            while self.nbytes > self.max_bytes:
+                _key, old = self._items.popitem(last=False)
+                self.nbytes -= len(old)
+
+    def get(self, key, timeout=120):
+        """Return (bytes, hit)."""
+        body, future = self._future(key)
+        if future is None:
+            return body, True
+        return future.result(timeout), False
+
+    def warm(self, variants):
+        """Start rendering some (name, query) variants in the background."""
+        for name, query in variants:
+            self._future(normalize(name, query))
+
+
+class Handler(BaseHTTPRequestHandler):
+    cache = None  # set by serve()
+    versions = {}  # figure name -> fingerprint(), set by serve()
+
+    def do_GET(self):
+        url = urlsplit(self.path)
+        name = url.path.strip("/")
+        if not name:
+            index = {n: {p: spec[1] for p, spec in f.params.items()} for n, f in FIGURES.items()}
+            return self._send(200, "application/json", json.dumps(index, indent=1).encode())
+        try:
+            key = normalize(name, parse_qs(url.query))
+        except KeyError:
+            return self._send(404, "text/plain", f"no figure called {name}\n".encode())
+        except ValueError as exc:
+            return self._send(400, "text/plain", f"{exc}\n".encode())
+
+        # the image depends on the key and on the code and data the workers
+        # loaded, so the ETag covers both
+        etag = '"{}"'.format(hashlib.sha1(repr((key, self.versions.get(name))).encode()).hexdigest()[:16])
+        if self.headers.get("If-None-Match") == etag:
+            return self._send(304, FORMATS[key[1]], b"", {"ETag": etag})
+        t0 = time.perf_counter()
+        try:
+            body, hit = self.cache.get(key)
+        except LookupError as exc:
+            return self._send(503, "text/plain", f"{exc}\n".encode())
+        except Exception as exc:
+            self.log_error("render of %s failed: %r", name, exc)
+            return self._send(500, "text/plain", b"render failed\n")
+        self._send(
+            200, FORMATS[key[1]], body,
+            {
+                "ETag": etag,
+                "Cache-Control": "public, max-age=3600",
+                "X-Render-Cache": "hit" if hit else "miss",
+                "Server-Timing": f"render;dur={1e3 * (time.perf_counter() - t0):.1f}",
+            },
+        )
+
+    def _send(self, status, content_type, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    do_HEAD = do_GET
+
+
+def serve(host="localhost", port=8000, workers=None, max_bytes=256 * 2**20, warm=True):
+    # taken once, as the workers load their data once
+    Handler.versions = {name: fingerprint(figure) for name, figure in FIGURES.items()}
+    with concurrent.futures.ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        Handler.cache = RenderCache(pool, max_bytes)
+        if warm:
+            Handler.cache.warm(WARM)
+        server = ThreadingHTTPServer((host, port), Handler)
+        print(f"Serving figures on http://{host}:{server.server_port}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--host", default="localhost")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--cache-mb", type=float, default=256)
+    parser.add_argument("--no-warm", action="store_true")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, int(args.cache_mb * 2**20), not args.no_warm)